@@ -15,21 +15,25 @@ r"""A module to help with storing validated data.
 
 import re
 
-from os.path import exists
+from os import stat
+from os.path import abspath, exists
+from threading import Lock
 
 from json import loads, dumps
 from collections import OrderedDict
+from copy import deepcopy
 
 from ec.utils import get
-from laufire.extensions import combine, nest, unnest
+from laufire.extensions import combine, nest
 from laufire.parser import parse as _parse
 from laufire.sqlitex import SQLiteDB, SQLiteSimpleTable
-from laufire.yamlex import YamlEx
 
 # State
 State = []
 keyPartPattern = re.compile(r'([^/]+/)')
 Commands = ['setup', 'var', 'dump']
+SharedValues = {} # The decoded values of the stores, shared across the process. Keyed by (filePath, tableName).
+sharedValuesLock = Lock()
 
 # Helpers
 def getName(Obj, Dict):
@@ -125,7 +129,52 @@ def getStoreTable(Config):
 	DB.execute("CREATE TABLE IF NOT EXISTS %s (`route` TEXT PRIMARY KEY, value TEXT)" % tableName)
 	DB.close()
 
-	return SQLiteSimpleTable(filePath, tableName, 'route')
+	return SQLiteSimpleTable(filePath, tableName, 'route', Config.get('profile'))
+
+def getStoreValues(filePath, tableName='ecstore', profile=None):
+	r"""Returns the decoded values of the given store, from a process-wide cache.
+
+	The cache is revalidated on every call with *PRAGMA data_version*, which changes whenever other connections (even of other processes) commit to the DB. Replaced DB files are detected through their inodes.
+
+	#Note: The returned dict and its values are shared. Hence, they shouldn't be modified. The stores copy the mutable values (check copyValue).
+	"""
+	key = (abspath(filePath), tableName)
+	Stat = stat(filePath)
+	fileID = (Stat.st_dev, Stat.st_ino)
+
+	with sharedValuesLock:
+		Entry = SharedValues.get(key)
+
+		if Entry and Entry['fileID'] != fileID: # The DB file was replaced.
+			Entry['Store'].close()
+			Entry = None
+
+		if not Entry:
+			Entry = {'fileID': fileID, 'Store': SQLiteSimpleTable(filePath, tableName, 'route', profile, check_same_thread=False), 'version': None}
+			SharedValues[key] = Entry
+
+		Store = Entry['Store']
+		version = Store.getDataVersion()
+
+		if version != Entry['version']:
+			Entry['Values'] = {k: loads(v) for k, v in Store.getCol('value').iteritems()}
+			Entry['version'] = version
+
+		return Entry['Values']
+
+def copyValue(value):
+	r"""Copies the mutable values (lists and dicts), so that the values shared through getStoreValues won't be modified through their users.
+	"""
+	return deepcopy(value) if isinstance(value, (list, dict)) else value
+
+def clearStoreValues():
+	r"""Clears the shared cache of the store values and closes its DBs.
+	"""
+	with sharedValuesLock:
+		for Entry in SharedValues.values():
+			Entry['Store'].close()
+
+		SharedValues.clear()
 
 def split(route):
 	i = route.rfind('/')
@@ -165,33 +214,54 @@ class ReadOnlyStore:
 		Config:
 			filePath: The path to the store.
 			tableName (str): The table name of the store, defaults to ecstore.
+			profile (str): The sqlitex profile to open the store with.
+			lazy (bool): When set to True, the values are read and decoded on their first access, instead of on initialization. The DB is kept open till the store is closed.
+			shared (bool): When set to True, the decoded values are reused from the process-wide cache, as long as the DB hasn't changed. Check getStoreValues.
 		"""
-		Store = SQLiteSimpleTable(Config['filePath'], Config.get('tableName', 'ecstore'), 'route')
-		self._Values = Values = {k: loads(v) for k, v in Store.getCol('value').iteritems()}
-		Store.close()
+		tableName = Config.get('tableName', 'ecstore')
+		self._lazy = Config.get('lazy')
+		self._Store = None
+
+		if self._lazy:
+			self._Store = SQLiteSimpleTable(Config['filePath'], tableName, 'route', Config.get('profile'))
+			self._Values = {}
+			self._branchQuery = "SELECT `route`, `value` FROM `%s` WHERE `route` >= ? AND `route` < ?;" % tableName
+			return
+
+		if Config.get('shared'):
+			Values = {k: copyValue(v) for k, v in getStoreValues(Config['filePath'], tableName, Config.get('profile')).iteritems()} # The shared values are copied, as the branches are indexed into them and as they could be modified by the users.
 
-		Routes = Values.keys()
+		else:
+			Store = SQLiteSimpleTable(Config['filePath'], tableName, 'route', Config.get('profile'))
+			Values = {k: loads(v) for k, v in Store.getCol('value').iteritems()}
+			Store.close()
+
+		self._Values = Values
 
 		# Add branch configs.
-		while Routes:
-			currentRoute = Routes.pop(0)
-			branch, leaf = split(currentRoute)
+		for route in Values.keys():
+			while True:
+				branch, leaf = split(route)
 
-			if not leaf: # The route points to the root, hence skip processing it to avoid infinite looping.
-				continue
+				if not leaf: # The route points to the root, hence skip processing it to avoid infinite looping.
+					break
 
-			Branch = Values.get(branch)
+				Branch = Values.get(branch)
 
-			if not Branch:
-				Values[branch] = Branch = {'Routes': []}
-				Routes.append(branch)
+				if Branch: # The ancestors of the branch are already indexed.
+					Branch['Routes'].append(route)
+					break
 
-			Branch['Routes'].append(currentRoute)
+				Values[branch] = {'Routes': [route]}
+				route = branch
 
 	def __getitem__(self, route):
 		return self.var(route)
 
 	def var(self, route):
+		if self._lazy:
+			return self._lazyVar(route)
+
 		Value = self._Values[route]
 
 		if hasattr(Value, '__getitem__') and 'Routes' in Value: # Return the values from the Children
@@ -204,23 +274,68 @@ class ReadOnlyStore:
 
 		return self._Values[route]
 
+	def _lazyVar(self, route):
+		Values = self._Values
+
+		if route in Values:
+			return Values[route]
+
+		Row = self._Store.get(route)
+
+		if Row:
+			Values[route] = value = loads(Row['value'])
+			return value
+
+		# We've got a branch. Hence, query its descendants by the route prefix, which uses the index of the primary key.
+		Store = self._Store
+		prefix = '%s/' % route if route else ''
+		Rows = Store.execute(self._branchQuery, [prefix, '%s0' % route]).fetchall() if route else Store.execute(Store._Statements['getAll']).fetchall() #pylint: disable=W0212
+
+		if not Rows:
+			raise KeyError(route)
+
+		Leaves = {}
+		prefixLength = len(prefix)
+
+		for Row in Rows:
+			leafRoute = Row['route']
+
+			if leafRoute not in Values:
+				Values[leafRoute] = loads(Row['value'])
+
+			Leaves[leafRoute[prefixLength:]] = Values[leafRoute]
+
+		return nest(Leaves)
+
+	def close(self):
+		if self._Store:
+			self._Store.close()
+			self._Store = None
+
 class ConfiguredStore:
 	def __init__(self, Buffer, Config):
 		self._Configs = Configs = Buffer['Configs']
 		self._Values = Values = Buffer['Values']
 		self._Store = Store = getStoreTable(Config)
 
-		StoreValues = Store.getCol('value')
+		if Config.get('shared'):
+			StoreValues = getStoreValues(Config['filePath'], Config.get('tableName', 'ecstore'), Config.get('profile'))
+			decode = copyValue
 
-		for route, value in Values.iteritems(): # Write any parsed values to the DB, so that the DB could be shared without the parsed source.
-			self._set(route, value)
+		else:
+			StoreValues = Store.getCol('value')
+			decode = loads
 
-		for route, value in StoreValues.iteritems():
-			if route in Configs:
-				Values[route] = loads(value)
+		with Store.batch():
+			for route, value in Values.iteritems(): # Write any parsed values to the DB, so that the DB could be shared without the parsed source.
+				self._set(route, value)
 
-			elif route not in Values: # Delete residual routes from the DB.
-				Store.delete(route)
+			for route, value in StoreValues.iteritems():
+				if route in Configs:
+					Values[route] = decode(value)
+
+				elif route not in Values: # Delete residual routes from the DB.
+					Store.delete(route)
 
 		for key, value in Values.iteritems():
 			Config = Configs.get(key)
@@ -228,11 +343,10 @@ class ConfiguredStore:
 			if Config and 'live' in Config:
 				Config['hook'](value, 'init')
 
-		Y = YamlEx()
-		Y.setData(nest(Values))
-		Y.interpolate()
+		from laufire.interpolator import Interpolator
 
-		self._Values = unnest(Y.Data)
+		self._Interpolator = Interpolator(Values)
+		self._Values = self._Interpolator.Values
 
 	def __del__(self):
 		if hasattr(self, '_Store'):
@@ -336,7 +450,12 @@ class ConfiguredStore:
 
 	def _set(self, route, value):
 		self._Store.set({'route': route, 'value': dumps(value)}) # Set the value in the DB.
-		self._Values[route] = value # Set the value in the Cache.
+
+		if hasattr(self, '_Interpolator'): # Set the value in the Cache and re-render its dependents.
+			self._Interpolator.set(route, value)
+
+		else:
+			self._Values[route] = value
 
 	def dump(self, route=''):
 		Routes = self._Configs[route]['Routes']
@@ -368,6 +487,9 @@ def getStore(**Config):
 	Config:
 		filePath (str): The path to the store.
 		tableName (str): The table name of the store, defaults to ecstore.
+		profile (str): The sqlitex profile to open the store with. Ex: concurrent-read.
+		lazy (bool): Reads the values on their first access. Helps with reading a few values from large stores.
+		shared (bool): Reuses the decoded values across the stores of the process, till the DB changes. Helps with long-running processes, which open the same stores repeatedly.
 	"""
 	return ReadOnlyStore(**Config)
 
@@ -379,6 +501,8 @@ def root(Cls=None, **Config):
 	Config:
 		filePath: The path to the store.
 		tableName (str): The table name of the store, defaults to ecstore.
+		profile (str): The sqlitex profile to open the store with.
+		shared (bool): Reads the stored values through the process-wide cache. Check getStoreValues.
 		noAutoSetup (bool): Skips the auto-setup (setting up the data, when the script is inovked directly).
 	"""
 	if not Cls: # The decorator has some config. Hence return a wrapper to process the following class.
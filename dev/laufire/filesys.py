@@ -41,11 +41,13 @@ Glob
 """
 
 import os
+from collections import OrderedDict
 from os import mkdir, makedirs, unlink, rmdir
-from os.path import abspath, basename, commonprefix, dirname, exists, isdir, isfile, join as pathJoin, normpath, split as pathSplit, splitext
-from re import match, escape as escapeRe
+from os.path import abspath, basename, dirname, exists, isdir, isfile, islink, join as pathJoin, normpath, realpath, split as pathSplit, splitext
+from re import compile as compileRe, escape as escapeRe
+from threading import Lock
 
-from laufire.flow import forgive
+from laufire.flow import forgive, rob
 from laufire.logger import debug
 from laufire.utils import getRandomString, getTimeString
 from laufire.helpers.filesys import link, symlink, rmlink, isLinkedDir
@@ -53,9 +55,16 @@ from laufire.helpers.filesys import link, symlink, rmlink, isLinkedDir
 # State
 fsRoot = '.' # Risky filesystem operations such as removePath are limited to fsRoot.
 sep = os.sep
+PatternCache = OrderedDict() # Compiled (includes, excludes) pairs, keyed by (pattern, regex), in the order of their use.
+patternCacheLock = Lock()
 
 # Data
-Ext2Opener = {'zip': ('zipfile', 'ZipFile'), 'gz': 'gzip'} # #Pending: Instead of having module, object pairs import objects (for that write a support module. ie: import_obj('zipfile.ZipFile')
+Ext2Opener = {'zip': ('zipfile', 'ZipFile'), 'gz': 'gzip', 'tgz': 'gzip'} # #Pending: Instead of having module, object pairs import objects (for that write a support module. ie: import_obj('zipfile.ZipFile')
+copyBufferSize = 1024 * 1024 # The buffer size of the user-space copies.
+patternCacheSize = 256 # The maximum number of compiled patterns to cache.
+FICLONE = 0x40049409 # The Linux ioctl to reflink files (supported by btrfs, xfs etc).
+maxInMemorySize = 16 * 1024 * 1024 # Larger files are deflated into temp files by compressTree, so that their data wouldn't be held in memory.
+maxBatchSize = 64 * 1024 * 1024 # The maximum size of the in-memory files, that compressTree deflates at once.
 
 # Helpers
 def globToRe(pattern):
@@ -91,6 +100,162 @@ def globsToIncludesAndExcludes(pattern):
 	
 	return includes, excludes
 
+def getMatchers(pattern, regex=False):
+	r"""Returns a pair of the match functions of the compiled includes and excludes (None when there are no exclusions) of the given pattern.
+
+	#Note: The results are cached (in a bounded LRU cache), as the same patterns are used repeatedly over large trees.
+	"""
+	key = (pattern, regex)
+
+	with patternCacheLock:
+		Matchers = PatternCache.pop(key, None)
+
+		if Matchers:
+			PatternCache[key] = Matchers # Mark the pattern as the most recently used.
+			return Matchers
+
+	if regex:
+		Split = pattern.split('$$$')
+		includes = Split[0] or r'.*'
+		excludes = Split[1] if len(Split) > 1 else None
+
+	else:
+		includes, excludes = globsToIncludesAndExcludes(pattern)
+
+	Matchers = compileRe(includes).match, compileRe(excludes).match if excludes else None
+
+	with patternCacheLock:
+		while len(PatternCache) >= patternCacheSize:
+			PatternCache.popitem(last=False) # Evict the least recently used.
+
+		PatternCache[key] = Matchers
+
+	return Matchers
+
+def _getScanner():
+	r"""Returns a function that yields (name, isDir, isLink) tuples for the entries of a dir.
+
+	#Note: scandir is preferred as its DirEntry-s carry the type info, thus saving a stat call per entry. The PyPI backport, scandir is used on Python 2, when available.
+	"""
+	scandir = getattr(os, 'scandir', None)
+
+	if not scandir:
+		try:
+			from scandir import scandir
+
+		except ImportError:
+			pass
+
+	if scandir:
+		def scan(dir):
+			for Entry in scandir(dir):
+				yield Entry.name, Entry.is_dir(), Entry.is_symlink()
+
+	else:
+		from stat import S_ISDIR, S_ISLNK
+
+		def scan(dir):
+			for name in os.listdir(dir):
+				path = pathJoin(dir, name)
+
+				try:
+					mode = os.lstat(path).st_mode
+
+				except OSError: # The entry was removed, after the listing.
+					continue
+
+				isLink = S_ISLNK(mode)
+
+				yield name, (isdir(path) if isLink else S_ISDIR(mode)), isLink # #Note: Only the links need a second stat, to resolve their targets.
+
+	return scan
+
+scan = _getScanner()
+
+def _reflink(src, tgt, dummy):
+	from fcntl import ioctl
+
+	ioctl(tgt.fileno(), FICLONE, src.fileno())
+
+def _copyFileRange(src, tgt, size):
+	srcFD, tgtFD = src.fileno(), tgt.fileno()
+	offset = 0
+
+	while offset < size:
+		copied = os.copy_file_range(srcFD, tgtFD, size - offset, offset, offset)
+
+		if not copied: # The source was truncated.
+			break
+
+		offset += copied
+
+def _sendfile(src, tgt, size):
+	srcFD, tgtFD = src.fileno(), tgt.fileno()
+	offset = 0
+
+	while offset < size:
+		sent = os.sendfile(tgtFD, srcFD, offset, size - offset)
+
+		if not sent:
+			break
+
+		offset += sent
+
+def _readinto(src, tgt, dummy):
+	Buffer = bytearray(copyBufferSize)
+	View = memoryview(Buffer)
+
+	while True:
+		read = src.readinto(Buffer)
+
+		if not read:
+			break
+
+		tgt.write(View[:read])
+
+def _getCopyStrategies():
+	r"""Returns the available (name, copier) pairs, in the order of preference.
+
+	#Note: The kernel-side copies keep the data out of the user-space. They are tried only when the platform supports them, and are skipped on errors like EXDEV, EOPNOTSUPP etc.
+	"""
+	Strategies = []
+
+	if hasattr(os, 'uname') and os.uname()[0] == 'Linux':
+		Strategies.append(('reflink', _reflink))
+
+	if hasattr(os, 'copy_file_range'):
+		Strategies.append(('copy_file_range', _copyFileRange))
+
+	if hasattr(os, 'sendfile') and sep == '/':
+		Strategies.append(('sendfile', _sendfile))
+
+	return Strategies
+
+CopyStrategies = _getCopyStrategies()
+
+def _copyFile(srcPath, tgtPath):
+	r"""Copies the content of the given file with the fastest available strategy. Returns the name of the strategy used.
+	"""
+	from io import open as ioOpen
+
+	with ioOpen(srcPath, 'rb') as src:
+		with ioOpen(tgtPath, 'wb') as tgt:
+			size = os.fstat(src.fileno()).st_size
+
+			if size:
+				for name, copier in CopyStrategies:
+					try:
+						copier(src, tgt, size)
+						return name
+
+					except (IOError, OSError): # The strategy isn't supported for the given files. Hence, discard any partial output and try the next.
+						tgt.seek(0)
+						tgt.truncate()
+
+			_readinto(src, tgt, size)
+
+			return 'readinto'
+
 makeMissingDir = lambda path: exists(path) or makeDir(path)
 
 def rmtree(tgtPath):
@@ -120,9 +285,12 @@ def _makeLink(srcPath, tgtPath, pathType, hardLink):
 
 def _removePath(tgtPath): # #Pending: Check if the call could be made more efficient.
 	if not exists(tgtPath):
-		return 1
+		if not islink(tgtPath):
+			return 1
+
+		unlink(tgtPath) # A broken link.
 
-	if isfile(tgtPath):
+	elif isfile(tgtPath):
 		unlink(tgtPath)
 
 	elif isLinkedDir(tgtPath):
@@ -134,6 +302,97 @@ def _removePath(tgtPath): # #Pending: Check if the call could be made more effic
 	else:
 		return 1 # error
 
+def getLineage(path):
+	r"""Returns the given relative path, along with its ancestors.
+	"""
+	Parts = path.split('/')
+
+	return ['/'.join(Parts[:i]) for i in range(1, len(Parts) + 1)]
+
+def _sync(srcPath, tgtPath, pattern, regex, transfer, isCurrent):
+	r"""Syncs the target with the source, by transferring only the missing or the changed files and by removing the stale paths. Returns a summary of the changes.
+	"""
+	requireAncestor(tgtPath)
+
+	Summary = {'added': 0, 'updated': 0, 'removed': 0}
+
+	if getPathType(srcPath) == 1:
+		if not isfile(tgtPath):
+			Summary['added'] = 1
+			Summary['removed'] = int(exists(tgtPath))
+			removePath(tgtPath)
+			ensureParent(tgtPath)
+			transfer(srcPath, tgtPath)
+
+		elif not isCurrent(srcPath, tgtPath):
+			Summary['updated'] = 1
+			removePath(tgtPath)
+			transfer(srcPath, tgtPath)
+
+		return Summary
+
+	if not isContainer(tgtPath):
+		removePath(tgtPath)
+		ensureDir(tgtPath)
+
+	Target = dict(collectPaths(tgtPath, pattern, regex, False))
+	Removed = set()
+	isPresent = lambda path: path in Target and not (Removed and Removed.intersection(getLineage(path)))
+
+	for path in sorted(Target.keys()): # #Note: Sorting lets the parents to be removed before their children.
+		if not isPresent(path): # The path was removed along with its parent.
+			continue
+
+		srcType = getPathType(joinPaths(srcPath, path))
+
+		if not srcType or (srcType == 1) != (Target[path] == 1) or Target[path] == 3: # #Note: Linked dirs in the target are replaced, so that the transfers won't go through them (to paths outside the target).
+			removePath(joinPaths(tgtPath, path))
+			Removed.add(path)
+			Summary['removed'] += 1
+
+	for path, pathType in collectPaths(srcPath, pattern, regex):
+		_srcPath, _tgtPath = pair(srcPath, tgtPath, path)
+
+		if not isPresent(path):
+			Summary['added'] += 1
+
+			if pathType != 1:
+				ensureDir(_tgtPath)
+
+			else:
+				ensureParent(_tgtPath)
+				transfer(_srcPath, _tgtPath)
+
+		elif pathType == 1 and not isCurrent(_srcPath, _tgtPath):
+			Summary['updated'] += 1
+			removePath(_tgtPath)
+			transfer(_srcPath, _tgtPath)
+
+	debug('synced: %s => %s (%s)' % (srcPath, tgtPath, ', '.join('%s: %s' % Item for Item in sorted(Summary.items()))))
+
+	return Summary
+
+def _syncCopy(srcPath, tgtPath, pattern, regex, workers, useMD5):
+	Pairs = []
+
+	def copier(srcPath, tgtPath):
+		if workers:
+			Pairs.append((srcPath, tgtPath))
+
+		else:
+			copyContent(srcPath, tgtPath, autoClean=False)
+			copyTimes(srcPath, tgtPath)
+
+	Summary = _sync(srcPath, tgtPath, pattern, regex, copier, lambda src, tgt: isSameFile(src, tgt, useMD5))
+
+	if Pairs:
+		copyContents(Pairs, workers, False)
+
+		for Pair in Pairs:
+			copyTimes(*Pair)
+
+	return Summary
+
 def _getOpener(ext):
 	opener = Ext2Opener.get(ext)
 
@@ -150,9 +409,232 @@ def _getOpener(ext):
 	else:
 		return lambda filePath: open(filePath, 'rb')
 
+def _ensureParents(Paths):
+	r"""Ensures the parent dirs of the given paths, in the calling thread, so that concurrent writers won't race to make them.
+	"""
+	for parentPath in sorted(set(dirname(normpath(path)) for path in Paths)):
+		ensureDir(parentPath)
+
 def doNoting(firstArg, *dummy, **dummy1):
 	return firstArg
 
+def _deflate(Args):
+	r"""Deflates the given file, within the workers of compressTree. Returns (deflated data, temp path, CRC, size, compressed size). Either the data or the temp path holding it is given.
+
+	Args:
+		spoolDir (str): When given, the file is deflated as a stream into a temp file within the dir, instead of into memory.
+	"""
+	import zlib
+
+	filePath, compressLevel, spoolDir = Args
+	Compressor = zlib.compressobj(compressLevel, zlib.DEFLATED, -15) # #Note: Negative window bits produce the raw deflate streams, that zip members hold.
+
+	if not spoolDir:
+		with open(filePath, 'rb') as file:
+			data = file.read()
+
+		deflated = Compressor.compress(data) + Compressor.flush()
+
+		return deflated, None, zlib.crc32(data) & 0xffffffff, len(data), len(deflated)
+
+	from tempfile import mkstemp
+
+	handle, tempPath = mkstemp(dir=spoolDir)
+	crc = size = compressSize = 0
+
+	with os.fdopen(handle, 'wb') as file:
+		for chunk in iterateContent(filePath, copyBufferSize):
+			crc = zlib.crc32(chunk, crc)
+			size += len(chunk)
+			deflated = Compressor.compress(chunk)
+			compressSize += len(deflated)
+			file.write(deflated)
+
+		deflated = Compressor.flush()
+		compressSize += len(deflated)
+		file.write(deflated)
+
+	return None, tempPath, crc & 0xffffffff, size, compressSize
+
+def _writeDeflated(ZipFileObj, filePath, arcname, Deflated):
+	r"""Writes the given pre-deflated data (from _deflate) as a member of the given ZipFile.
+
+	#Note: zipfile has no API to add pre-deflated members. Hence, this writes into the internals of the ZipFile (fp, filelist, NameToInfo and _didModify), as laid out by the zipfile of Python 2.7. It isn't thread-safe, as the ZipFile of Python 2.7 has no locks. compressTree doesn't use it with other versions.
+	"""
+	from time import localtime
+	from zipfile import ZipInfo, ZIP_DEFLATED
+
+	data, tempPath, crc, size, compressSize = Deflated
+	Stat = os.stat(filePath)
+
+	Info = ZipInfo(arcname, localtime(Stat.st_mtime)[:6])
+	Info.external_attr = (Stat.st_mode & 0xFFFF) << 16
+	Info.compress_type = ZIP_DEFLATED
+	Info.CRC = crc
+	Info.file_size = size
+	Info.compress_size = compressSize
+	Info.header_offset = ZipFileObj.fp.tell()
+
+	ZipFileObj.fp.write(Info.FileHeader()) # #Note: FileHeader adds the zip64 extra, when the sizes need it.
+
+	if tempPath is None:
+		ZipFileObj.fp.write(data)
+
+	else:
+		for chunk in iterateContent(tempPath, copyBufferSize):
+			ZipFileObj.fp.write(chunk)
+
+		unlink(tempPath)
+
+	ZipFileObj.filelist.append(Info)
+	ZipFileObj.NameToInfo[arcname] = Info
+	ZipFileObj._didModify = True # #Note: As with ZipFile.write. ZipFile.close writes the central directory only when it's set (which the mode 'a' doesn't do by itself). #pylint: disable=protected-access
+
+def _getCRC(filePath):
+	import zlib
+
+	crc = 0
+
+	for chunk in iterateContent(filePath, copyBufferSize):
+		crc = zlib.crc32(chunk, crc)
+
+	return crc & 0xffffffff
+
+def _getMemberPath(Info, tgtPath):
+	r"""Returns the path, that ZipFile.extract extracts the given member to.
+	"""
+	name = Info.filename.replace('/', sep)
+
+	if os.altsep:
+		name = name.replace(os.altsep, sep)
+
+	name = sep.join(part for part in os.path.splitdrive(name)[1].split(sep) if part not in ('', os.curdir, os.pardir)) # #Note: As with ZipFile.extract, so that crafted names ('../' etc) won't lead outside the tgtPath.
+
+	return pathJoin(tgtPath, name)
+
+def _isExtracted(Info, tgtPath):
+	r"""Checks whether the given zip member is already extracted, by its size and CRC.
+	"""
+	memberPath = _getMemberPath(Info, tgtPath)
+
+	if Info.filename.endswith('/'):
+		return isdir(memberPath)
+
+	return isfile(memberPath) and os.stat(memberPath).st_size == Info.file_size and _getCRC(memberPath) == Info.CRC
+
+def _extractZip(srcPath, tgtPath, matches, workers):
+	from zipfile import ZipFile
+
+	with ZipFile(srcPath, 'r') as Z:
+		Members = [Info for Info in Z.infolist() if matches(Info.filename.rstrip('/'))]
+
+	Pending = [Info for Info in Members if not _isExtracted(Info, tgtPath)]
+	Files = []
+
+	for Info in Pending: # #Note: The dirs are made by the calling thread, as ZipFile.extract doesn't tolerate concurrent makers of the same parents.
+		memberPath = _getMemberPath(Info, tgtPath)
+		requireAncestor(memberPath, tgtPath)
+
+		if Info.filename.endswith('/'):
+			ensureDir(memberPath)
+
+		else:
+			Files.append(Info)
+
+	_ensureParents(_getMemberPath(Info, tgtPath) for Info in Files)
+
+	def worker(Batch):
+		with ZipFile(srcPath, 'r') as Z: # #Note: Every worker has its own handle, as the reads of a ZipFile share a file position.
+			for Info in Batch:
+				Z.extract(Info, tgtPath)
+
+	if workers > 1 and len(Files) > 1:
+		from multiprocessing.pool import ThreadPool
+
+		Pool = ThreadPool(workers)
+
+		try:
+			Pool.map(worker, [Files[i::workers] for i in range(workers)]) # #Note: zlib releases the GIL, while inflating.
+
+		finally:
+			Pool.close()
+			Pool.join()
+
+	else:
+		worker(Files)
+
+	return {'extracted': len(Pending), 'skipped': len(Members) - len(Pending)}
+
+def _extractTar(srcPath, tgtPath, matches, ext):
+	r"""Extracts the given tar file (compressed or not), as a stream.
+	"""
+	import tarfile
+
+	count = 0
+	realTgtPath = realpath(tgtPath)
+	Links = set() # The names of the extracted symlinks.
+
+	with _getOpener(ext)(srcPath) as File:
+		Tar = tarfile.open(fileobj=File, mode='r|')
+
+		for Info in Tar:
+			name = normpath(Info.name) # #Note: Names are normalized, as tars often hold names like './dir/file'.
+
+			if not matches(name):
+				continue
+
+			parent = dirname(name)
+
+			while parent:
+				if parent in Links:
+					raise Exception('"%s" is under the extracted symlink "%s"' % (Info.name, parent))
+
+				parent = dirname(parent)
+
+			memberPath = pathJoin(realTgtPath, name)
+			requireAncestor(realpath(memberPath), realTgtPath) # #Note: The paths are resolved, so that the links (extracted earlier or already in the target) can't lead the members out.
+
+			if Info.issym():
+				requireAncestor(realpath(pathJoin(dirname(memberPath), Info.linkname)), realTgtPath)
+				Links.add(name)
+
+			elif Info.islnk():
+				requireAncestor(realpath(pathJoin(realTgtPath, Info.linkname)), realTgtPath)
+
+			Tar.extract(Info, tgtPath)
+			count += 1
+
+	return {'extracted': count, 'skipped': 0}
+
+def _extractGzip(srcPath, tgtPath, matches):
+	name = splitext(basename(srcPath))[0]
+
+	if not matches(name):
+		return {'extracted': 0, 'skipped': 0}
+
+	filePath = pathJoin(tgtPath, name)
+	ensureParent(filePath)
+
+	with _getOpener('gz')(srcPath) as src, open(filePath, 'wb') as tgt:
+		for chunk in iter(lambda: src.read(copyBufferSize), b''):
+			tgt.write(chunk)
+
+	return {'extracted': 1, 'skipped': 0}
+
+class CountingWriter:
+	r"""Writes to the given file, while counting the bytes written.
+	"""
+	def __init__(self, File):
+		self.File = File
+		self.count = 0
+
+	def write(self, data):
+		self.File.write(data)
+		self.count += len(data)
+
+	def flush(self):
+		self.File.flush()
+
 # Exports
 ## Path functions
 stdPath = (lambda path: path.replace('\\', '/')) if sep != '/' else doNoting # Standardizes the given path.
@@ -160,10 +642,10 @@ stdPath = (lambda path: path.replace('\\', '/')) if sep != '/' else doNoting # S
 def filterPaths(Paths, pattern):
 	r"""Filters the given Paths with the given pattern.
 	"""
-	includes, excludes = globsToIncludesAndExcludes(pattern)
-	
+	includes, excludes = getMatchers(pattern)
+
 	for path in Paths:
-		if match(includes, path) and not match(excludes, path):
+		if includes(path) and not (excludes and excludes(path)):
 			yield path
 
 def pair(src, tgt, postFix):
@@ -241,9 +723,10 @@ def isDescendant(probableDescendant, requiredAncestor):
 		probableDescendant (str): The absolute path of the probable descendant.
 		requiredAncestor (str): The absolute path of the required ancestor.
 	"""
+	probableDescendant = abspath(probableDescendant)
 	requiredAncestor = abspath(requiredAncestor)
 
-	return commonprefix([abspath(probableDescendant), requiredAncestor]) == requiredAncestor
+	return probableDescendant == requiredAncestor or probableDescendant.startswith(requiredAncestor.rstrip(sep) + sep) # #Note: The paths are compared by their components, so that siblings like /x/out-evil won't pass for the descendants of /x/out.
 
 def requireAncestor(path, requiredAncestor=None):
 	r"""Ensures that the given path is a decendant of the required ancestor.
@@ -278,34 +761,43 @@ def collectPaths(base='.', pattern='**', regex=False, followlinks=True):
 			(regex): A '|' separated list of regex. Includes and excludes are separated by a '$$$'. Defaults to all ('.*').
 		regex (bool, False): When set to True, Includes and Excludes are parsed as regular expressions, instead of as globs.
 
-	#From: http://stackoverflow.com/questions/5141437/filtering-os-walk-dirs-and-files
 	#Note: The globs are not regular globs. But a simplified versions.
-	#Note: Exclusions override inclusions.
+	#Note: Exclusions override inclusions. Excluded dirs aren't descended into.
+	#Note: Linked dirs are yielded with the pathType 3, as with getPathType.
 	"""
-	if regex:
-		Split = pattern.split('$$$')
-		includes = Split[0] or r'.*'
-		excludes = Split[1] if len(Split) > 1 else None
+	includes, excludes = getMatchers(pattern, regex)
+	Pending = [(base, '')]
 
-	else:
-		includes, excludes = globsToIncludesAndExcludes(pattern)
+	while Pending:
+		root, prefix = Pending.pop()
 
-	baseLen = len(base)
-	
-	for root, Dirs, Files in os.walk(base, followlinks=followlinks):
-		prefix = stdPath(root[baseLen+1:])
-		Joined = {d: joinPaths(*(prefix, d) if prefix else (d,)) for d in Dirs}
+		try:
+			Entries = list(scan(root))
+
+		except OSError: # #Note: Unreadable dirs are skipped, as with os.walk.
+			continue
+
+		Files = []
+
+		for name, isDir, isLink in Entries:
+			path = '%s/%s' % (prefix, name) if prefix else name
 
-		if excludes:
-			Dirs[:] = [d for d, j in Joined.iteritems() if not match(excludes, j)] # Exclude dirs from recursion.
+			if excludes and excludes(path):
+				continue
 
-		for d, j in [(d1, j1) for d1, j1 in Joined.iteritems() if d1 in Dirs and match(includes, j1)]: # Yield resulting dirs.
-			yield j, 2 if isdir(joinPaths(root, d)) else 3 # Check whether the path is a dir or a link.
+			if not isDir:
+				Files.append(path)
+				continue
 
-		Files = [joinPaths(*(prefix, f) if prefix else (f,)) for f in Files]
+			if includes(path):
+				yield path, 3 if isLink else 2
 
-		for file in [f for f in Files if not (excludes and match(excludes, f)) and match(includes, f)]:
-			yield file, 1
+			if followlinks or not isLink:
+				Pending.append((pathJoin(root, name), path))
+
+		for path in Files:
+			if includes(path):
+				yield path, 1
 
 def filter(files, pattern):
 	regexp = globToRe(pattern)
@@ -369,9 +861,17 @@ def rename(srcPath, tgtPath, autoClean=True):
 
 	os.rename(srcPath, tgtPath)
 
-def copy(srcPath, tgtPath, pattern='**', regex=False, autoClean=True):
+def copy(srcPath, tgtPath, pattern='**', regex=False, autoClean=True, workers=None, sync=False, useMD5=False):
 	r"""Copies one path to another.
+
+	Args:
+		workers (int): When given, the files are copied concurrently by that many threads, after the dirs are made. Errors are then raised together, after all the files are processed.
+		sync (bool): When set to True, only the changed files are copied and the stale target paths are removed. A summary of the changes is returned.
+		useMD5 (bool): With sync, files of the same size are compared by their MD5 digests, instead of their modification times.
 	"""
+	if sync:
+		return _syncCopy(srcPath, tgtPath, pattern, regex, workers, useMD5)
+
 	if autoClean:
 		removePath(tgtPath) # #Note: This also ensures that the target is under fsRoot.
 
@@ -386,7 +886,9 @@ def copy(srcPath, tgtPath, pattern='**', regex=False, autoClean=True):
 
 	else:
 		dirMaker = makeDir if autoClean else makeMissingDir
-		copier = fileCopier if autoClean or not exists(tgtPath) else copyContent # File safety isn't a concern inside a missing dir.
+		cleanFiles = not autoClean and exists(tgtPath) # File safety isn't a concern inside a missing dir.
+		copier = copyContent if cleanFiles else fileCopier
+		Pairs = [] if workers else None
 
 		makeMissingDir(tgtPath)
 
@@ -394,15 +896,29 @@ def copy(srcPath, tgtPath, pattern='**', regex=False, autoClean=True):
 			if pathType != 1:
 				dirMaker(joinPaths(tgtPath, path))
 
+			elif Pairs is not None:
+				Pairs.append(pair(srcPath, tgtPath, path))
+
 			else:
 				copier(*pair(srcPath, tgtPath, path))
 
-def linkTree(srcPath, tgtPath, pattern='**', regex=False, autoClean=True, hardLink=False):
+		if Pairs:
+			_ensureParents(tgt for dummy, tgt in Pairs) # #Note: The pattern might match the files, but not their dirs.
+			copyContents(Pairs, workers, cleanFiles)
+
+def linkTree(srcPath, tgtPath, pattern='**', regex=False, autoClean=True, hardLink=False, sync=False):
 	r"""Re-creates the structure of the source at the target by creating dirs and linking files.
+
+	Args:
+		sync (bool): When set to True, only the missing and the mislinked files are (re)linked and the stale target paths are removed. A summary of the changes is returned.
 	"""
 	_srcPath = abspath(srcPath) # Link sources should be abs-paths.
-	dirMaker = makeDir if autoClean else makeMissingDir
 	linkWorker = link if hardLink else symlink # Hard links aren't the default, as they can't work across drives.
+
+	if sync:
+		return _sync(_srcPath, tgtPath, pattern, regex, linkWorker, lambda src, tgt: isLinked(src, tgt, hardLink))
+
+	dirMaker = makeDir if autoClean else makeMissingDir
 	linker = linkWorker if autoClean or not exists(tgtPath) else lambda srcPath, tgtPath: (removePath(tgtPath), linkWorker(srcPath, tgtPath)) # File safety isn't a concern inside a missing dir.
 	parentMaker = ensureParent if pattern != '**' and not regex else doNoting
 
@@ -419,6 +935,40 @@ def linkTree(srcPath, tgtPath, pattern='**', regex=False, autoClean=True, hardLi
 			parentMaker(_tgtPath)
 			linker(joinPaths(_srcPath, path), _tgtPath)
 
+def isLinked(srcPath, tgtPath, hardLink=False):
+	r"""Checks whether the given target is a link to the given source.
+	"""
+	if hardLink:
+		return not islink(tgtPath) and bool(rob(lambda: os.path.samefile(srcPath, tgtPath)))
+
+	return rob(lambda: os.readlink(tgtPath)) == srcPath
+
+def isSameFile(srcPath, tgtPath, useMD5=False):
+	r"""Checks whether the given files are the same, by their sizes and modification times (or MD5 digests).
+	"""
+	srcStat, tgtStat = os.stat(srcPath), os.stat(tgtPath)
+
+	if srcStat.st_size != tgtStat.st_size:
+		return False
+
+	if useMD5:
+		from laufire.utils import getMD5
+
+		return getMD5(srcPath) == getMD5(tgtPath)
+
+	srcTime, tgtTime = srcStat.st_mtime, tgtStat.st_mtime
+
+	if srcTime % 1 and tgtTime % 1: # Both the filesystems keep sub-second mtimes.
+		return abs(srcTime - tgtTime) < 1e-5 # #Note: utime keeps only the microseconds.
+
+	return int(srcTime) == int(tgtTime) # #Note: The precision of mtimes differs across filesystems.
+
+def copyTimes(srcPath, tgtPath):
+	r"""Copies the access and modification times of one path to another.
+	"""
+	Stat = os.stat(srcPath)
+	os.utime(tgtPath, (Stat.st_atime, Stat.st_mtime))
+
 def ensureParent(childPath):
 	r"""Ensures the parent dir of the given childPathexists.
 
@@ -507,52 +1057,218 @@ def appendContent(filePath, content):
 
 def copyContent(srcPath, tgtPath, autoClean=True):
 	r"""
-	Copies the content of one file to another.
+	Copies the content of one file to another. Returns the name of the copy strategy used (reflink, copy_file_range, sendfile or readinto).
 
 	# #Note: Unlike shutil.copy attributes aren't copied.
+	# #Note: Kernel-side copies are preferred, when available. Check CopyStrategies for the supported strategies.
 	"""
 	if (removePath(tgtPath) == 1 if autoClean else True): # Ensure parent only if the path is not removed.
 		ensureParent(tgtPath)
 
-	debug('copy: %s => %s' % (srcPath, tgtPath))
-	with open(tgtPath, 'wb') as tgt:
-		for chunk in iterateContent(srcPath):
-			tgt.write(chunk)
+	strategy = _copyFile(srcPath, tgtPath)
+	debug('copy (%s): %s => %s' % (strategy, srcPath, tgtPath))
+
+	return strategy
+
+def copyContents(Pairs, workers=None, autoClean=True):
+	r"""Copies the contents of the given (srcPath, tgtPath) pairs, concurrently with the given number of threads.
+
+	#Note: Errors do not stop the other copies. They are raised together, once every pair is processed.
+	"""
+	def worker(Pair):
+		try:
+			copyContent(Pair[0], Pair[1], autoClean)
+
+		except Exception as e: #pylint: disable=W0703
+			return Pair[0], e
+
+	if workers and workers > 1:
+		from multiprocessing.pool import ThreadPool
+
+		Pool = ThreadPool(workers)
+		Results = Pool.map(worker, Pairs)
+		Pool.close()
+		Pool.join()
+
+	else:
+		Results = [worker(Pair) for Pair in Pairs]
+
+	Errors = [Result for Result in Results if Result]
+
+	if Errors:
+		raise Exception('Failed to copy %d file(s):\n%s' % (len(Errors), '\n'.join('%s: %s' % Error for Error in Errors)))
 
 def compress(srcPath, tgtPath): # #Note: shutil.make_archive isn't used, due to its forcing of the zip extension and due to the need for maintaing a compression standard.
+	compressTree(srcPath, tgtPath, workers=1)
+
+def compressTree(srcPath, tgtPath, pattern='**', regex=False, compressLevel=6, stored=False, storePattern=None, workers=None):
+	r"""Compresses the given path into a zip file. The files of dirs are deflated in parallel by a process pool, and are written in the order they are collected.
+
+	Args:
+		pattern, regex: Filter the files of dirs, as with collectPaths.
+		compressLevel (int): The deflate level (1 - 9).
+		stored (bool): Stores the files without compression (ZIP_STORED).
+		storePattern (glob): The files to store without compression. ex: '**.gz|**.jpg'; as compressing already compressed files is a waste.
+		workers (int): The number of processes to compress with. Defaults to the count of the CPUs. 1 compresses in-process.
+
+	#Note: The member names are relative to the given dir (the names of the files, for file sources). The CWD isn't changed, so that the call is thread-safe.
+	#Note: Only the files are added, dirs (empty ones included) aren't.
+	#Note: Files larger than maxInMemorySize are deflated into temp files, next to the tgtPath, up to one per worker at once. Hence, the free space there should allow for their compressed sizes.
+	#Note: The files are deflated at once, up to a total of maxBatchSize for the files deflated in memory. Hence, the memory used is about twice that.
+	#Note: The archive is removed, when the compression fails.
+	#Note: The pre-deflated members are written with the internals of the zipfile of Python 2.7. With other versions, the files are compressed by zipfile (in-process, at its default level).
+	"""
 	if not exists(srcPath):
-		raise('No such path: %s' % srcPath)
+		raise Exception('No such path: %s' % srcPath)
+
+	from sys import version_info
+	from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+	if isContainer(srcPath):
+		Members = [(pathJoin(srcPath, path), path) for path, pathType in collectPaths(srcPath, pattern, regex) if pathType == 1]
+
+	else:
+		Members = [(srcPath, basename(srcPath))]
+
+	isStored = getMatchers(storePattern)[0] if storePattern else lambda path: False
+	canWriteRaw = version_info[:2] == (2, 7)
 
 	ensureParent(tgtPath)
 
-	from zipfile import ZipFile, ZIP_DEFLATED
+	if not workers:
+		from multiprocessing import cpu_count
+		workers = cpu_count()
 
-	ZipFileObj = ZipFile(tgtPath, 'w', ZIP_DEFLATED)
+	Pool = None
+	spoolDir = None
+	Batch = [] # Consecutive files to be deflated together, as (filePath, arcname, spoolDir).
+	batchSize = spooled = 0
+	completed = False
 
-	cwd = os.getcwd() # The CWD circus is to reduce the relpath calls.
+	def flush():
+		Deflated = (Pool.map if Pool else map)(_deflate, [(Member[0], compressLevel, Member[2]) for Member in Batch])
 
-	if isContainer(srcPath):
-		os.chdir(srcPath)
+		for Member, Data in zip(Batch, Deflated):
+			_writeDeflated(ZipFileObj, Member[0], Member[1], Data)
 
-		for root, dummy1, Files in os.walk('.', followlinks=True):
-			for file in Files:
-				ZipFileObj.write(pathJoin(root, file))
+		del Batch[:]
 
-	else:
-		dir, name = pathSplit(srcPath)
-		os.chdir(dir)
+	ZipFileObj = ZipFile(tgtPath, 'w', ZIP_DEFLATED, True)
 
-		ZipFileObj.write(name)
+	try:
+		if workers > 1 and len(Members) > 1 and canWriteRaw:
+			from multiprocessing import Pool as ProcessPool
+			Pool = ProcessPool(workers)
 
-	os.chdir(cwd)
+		for filePath, arcname in Members:
+			if stored or isStored(arcname) or not canWriteRaw:
+				if Batch:
+					flush()
+					batchSize = spooled = 0
 
-	ZipFileObj.close()
+				ZipFileObj.write(filePath, arcname, ZIP_STORED if stored or isStored(arcname) else ZIP_DEFLATED)
+				continue
 
-def extract(srcPath, tgtPath): # #Note: The tagertPath points to the extraction root. Hence, it should be a dir.
-	from zipfile import ZipFile
+			size = os.stat(filePath).st_size
 
-	with ZipFile(srcPath, 'r') as Z:
-		Z.extractall(tgtPath)
+			if size > maxInMemorySize:
+				if not spoolDir:
+					from tempfile import mkdtemp
+					spoolDir = mkdtemp(dir=dirname(abspath(tgtPath)))
+
+				Batch.append((filePath, arcname, spoolDir))
+				spooled += 1
+
+			else:
+				Batch.append((filePath, arcname, None))
+				batchSize += size
+
+			if len(Batch) >= workers * 4 or spooled >= workers or batchSize >= maxBatchSize:
+				flush()
+				batchSize = spooled = 0
+
+		if Batch:
+			flush()
+
+		ZipFileObj.close()
+		completed = True
+
+	finally:
+		if Pool:
+			Pool.close() if completed else Pool.terminate() # The pending deflates of failed calls are of no use.
+			Pool.join()
+
+		if spoolDir:
+			rmtree(spoolDir)
+
+		if not completed: # The partial archive is removed.
+			forgive(ZipFileObj.close)
+			unlink(tgtPath)
+
+def extract(srcPath, tgtPath, pattern='**', regex=False, workers=None, requiredAncestor=None):
+	r"""Extracts the members of the given archive, that match the given pattern, into the given dir. Returns a summary of the extracted and the skipped members.
+
+	Args:
+		srcPath (str): A zip, tar, tar.gz (tgz) or gz file. Files of other extensions are treated as zips.
+		pattern, regex: Filter the members by their names, as with collectPaths.
+		workers (int): The number of threads to extract the zip members with. Defaults to the count of the CPUs.
+		requiredAncestor (str): The required ancestor of the tgtPath. Defaults to fsRoot.
+
+	#Note: The tagertPath points to the extraction root. Hence, it should be a dir.
+	#Note: The zip members that are already extracted (with the same sizes and CRCs) are skipped.
+	#Note: Tar and gz files are extracted as streams, in a single pass, without skipping.
+	"""
+	requireAncestor(tgtPath, requiredAncestor)
+
+	includes, excludes = getMatchers(pattern, regex)
+	matches = lambda name: includes(name) and not (excludes and excludes(name))
+
+	name = srcPath.lower()
+	ext = splitext(name)[1][1:]
+
+	if name.endswith('.tar') or name.endswith('.tar.gz') or ext == 'tgz':
+		return _extractTar(srcPath, tgtPath, matches, ext)
+
+	if ext == 'gz':
+		return _extractGzip(srcPath, tgtPath, matches)
+
+	if not workers:
+		from multiprocessing import cpu_count
+		workers = cpu_count()
+
+	return _extractZip(srcPath, tgtPath, matches, workers)
+
+def packTree(srcPath, File, pattern='**', regex=False, compressLevel=6):
+	r"""Packs the given dir as a tar stream into the given file-like object and returns the count of the bytes written.
+
+	Args:
+		File: An object with a write method. ex: A pipe or the stdin of a remote command.
+		compressLevel (int): The gzip compression level (0 - 9). The stream isn't gzipped when it is 0.
+
+	#Note: The stream is written sequentially (without seeks or temp files), so that it could be extracted as it's being written. ie: tar -xz -C tgtPath.
+	#Note: Linked dirs are packed as dirs, as with compress.
+	"""
+	if not isContainer(srcPath):
+		raise Exception('Not a dir: %s' % srcPath)
+
+	import tarfile
+	from gzip import GzipFile
+
+	Counter = CountingWriter(File)
+	Target = GzipFile(fileobj=Counter, mode='wb', compresslevel=compressLevel) if compressLevel else Counter
+	Tar = tarfile.open(fileobj=Target, mode='w|', dereference=True)
+
+	for path, dummy in collectPaths(srcPath, pattern, regex):
+		Tar.add(pathJoin(srcPath, path), path, False)
+
+	Tar.close()
+
+	if compressLevel:
+		Target.close() # #Note: Closing the GzipFile flushes its trailer, without closing the File.
+
+	Counter.flush()
+
+	return Counter.count
 
 def backup(srcPath, backupBase=None, addTimeString=True, keepOriginal=False): # #Pending: Change the name of the call to preserve or safeguard. As the current name could be misleading.
 	r"""Backs up the given path to a temporary location, so that the returned path could be later used to restore it to the original location.
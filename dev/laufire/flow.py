@@ -4,6 +4,7 @@ flow
 
 A module to control the flow of the application.
 """
+from heapq import heapify, heappop, heappush
 from time import sleep
 
 from laufire.logger import debug, log
@@ -11,32 +12,146 @@ from laufire.logger import debug, log
 defaultDelay = 0
 tickTime = 0.1
 
-def waitFor(func, maxWait=None, message=None):
+# State
+clock = None
+
+# Helpers
+def getMonotonicClock():
+	r"""Returns a clock, that isn't affected by the changes to the system time.
+	"""
+	try:
+		from time import monotonic as _monotonic
+		return _monotonic
+
+	except ImportError: # Python 2 lacks a monotonic clock.
+		pass
+
+	import sys
+
+	if sys.platform.startswith('linux'):
+		import ctypes
+
+		class TimeSpec(ctypes.Structure):
+			_fields_ = [('seconds', ctypes.c_long), ('nanoSeconds', ctypes.c_long)]
+
+		clockGetTime = ctypes.CDLL(None, use_errno=True).clock_gettime
+		CLOCK_MONOTONIC = 1
+
+		def _monotonic():
+			Spec = TimeSpec() # #Note: The struct isn't shared, so that the clock would be thread-safe.
+
+			if clockGetTime(CLOCK_MONOTONIC, ctypes.byref(Spec)):
+				raise OSError(ctypes.get_errno(), 'clock_gettime failed')
+
+			return Spec.seconds + Spec.nanoSeconds * 1e-9
+
+		return _monotonic
+
+	from time import time
+
+	return time # #Later: Use the monotonic clocks of the other platforms.
+
+def monotonic():
+	r"""Returns the seconds from an arbitrary point in time, that aren't affected by the changes to the system time.
+	"""
+	global clock
+
+	if not clock:
+		clock = getMonotonicClock() # #Note: The clock is resolved lazily, as ctypes is costly to import.
+
+	return clock()
+
+def getDelays(delay, backoff=1, maxDelay=None, jitter=0):
+	r"""Yields the delays between successive attempts.
+	"""
+	from random import random
+
+	while True:
+		current = delay if maxDelay is None else min(delay, maxDelay)
+
+		yield current * (1 + jitter * (2 * random() - 1)) if jitter else current
+
+		delay *= backoff
+
+def getTimeoutError(message):
+	return Exception('Maximum wait time exceded.' if not message else 'Failed waiting for: %s' % message)
+
+# Exports
+def waitFor(func, maxWait=None, message=None, interval=None, backoff=1, maxInterval=None, jitter=0, Exceptions=()):
 	r"""Waits for the given function to return a truthy or until a set time.
+
+	Args:
+		interval (float): The initial interval between the calls. Defaults to tickTime.
+		backoff (float): The factor to multiply the interval with, after each call.
+		maxInterval (float): The cap of the intervals.
+		jitter (float): The fraction (0 - 1), by which the intervals are randomized, so that concurrent waits won't synchronize.
+		Exceptions (tuple): The exceptions to treat as falsy results.
 	"""
-	waited = 0
 	maxWait = maxWait or defaultDelay
+	deadline = monotonic() + maxWait
+	Intervals = getDelays(tickTime if interval is None else interval, backoff, maxInterval, jitter)
 
 	if message:
 		log(message)
 
 	while True:
+		try:
+			ret = func()
 
-		ret = func()
+		except Exceptions as e:
+			debug(e)
+			ret = None
 
 		if ret:
 			return ret
 
-		waited += tickTime
+		remaining = deadline - monotonic()
+
+		if remaining <= 0:
+			raise getTimeoutError(message)
+
+		sleep(min(next(Intervals), remaining))
+
+def waitForMany(Funcs, maxWait=None, message=None, interval=None, backoff=1, maxInterval=None, jitter=0, Exceptions=()):
+	r"""Waits for all the given functions to return truthies or until a set time, from a single thread. Returns the results, in the order of the functions.
+
+	Each function is called on its own schedule. Check waitFor for the args.
+	"""
+	maxWait = maxWait or defaultDelay
+	deadline = monotonic() + maxWait
+	Results = [None] * len(Funcs)
+	Schedule = [(0, i, getDelays(tickTime if interval is None else interval, backoff, maxInterval, jitter)) for i in range(len(Funcs))] # [(due time, index, intervals)]
+	heapify(Schedule)
+
+	if message:
+		log(message)
 
-		if waited > maxWait:
-			raise Exception('Maximum wait time exceded.' if not message else 'Failed waiting for: %s' % message)
+	while Schedule:
+		due, i, Intervals = heappop(Schedule)
+		wait = due - monotonic()
 
-		if message:
-			debug(message)
+		if wait > 0:
+			sleep(wait)
 
-		debug('Waited: %d, MaxWait: %d.' % (waited, maxWait))
-		sleep(tickTime)
+		try:
+			ret = Funcs[i]()
+
+		except Exceptions as e:
+			debug(e)
+			ret = None
+
+		if ret:
+			Results[i] = ret
+			continue
+
+		current = monotonic()
+
+		if current >= deadline:
+			raise getTimeoutError(message or '%d of %d conditions' % (len(Schedule) + 1, len(Funcs)))
+
+		heappush(Schedule, (min(current + next(Intervals), deadline), i, Intervals))
+
+	return Results
 
 def forgive(func):
 	try:
@@ -55,20 +170,38 @@ def rob(func):
 	except: #pylint: disable=W0702
 		return
 
-def retry(func, repeat=3, delay=tickTime * 2):
+def retry(func, repeat=3, delay=tickTime * 2, backoff=1, maxDelay=None, jitter=0, timeout=None, Exceptions=()):
 	r"""
 	Calls the given function till it returns a value.
 
 	Set repeat to -1, to try untill success.
+
+	Args:
+		backoff (float): The factor to multiply the delay with, after each attempt.
+		maxDelay (float): The cap of the delays.
+		jitter (float): The fraction (0 - 1), by which the delays are randomized, so that concurrent retries won't synchronize.
+		timeout (float): The seconds after which, no more attempts are made.
+		Exceptions (tuple): The exceptions to retry upon. The last one is re-raised, when the attempts are exhausted.
 	"""
+	deadline = None if timeout is None else monotonic() + timeout
+	Delays = getDelays(delay, backoff, maxDelay, jitter)
+	isLast = lambda: not delay or repeat == 1 or (deadline is not None and monotonic() >= deadline)
+
 	while repeat:
-		result = func()
+		try:
+			result = func()
 
-		if result is None and delay and repeat != 1:
-			sleep(delay)
+		except Exceptions as e:
+			if isLast():
+				raise
+
+			debug(e)
 
 		else:
-			return result
+			if result is not None or isLast():
+				return result
+
+		sleep(next(Delays) if deadline is None else max(0, min(next(Delays), deadline - monotonic())))
 
 		repeat -= 1
 
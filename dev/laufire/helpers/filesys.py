@@ -3,10 +3,10 @@ A module to help with making the module, filesys, to wotk across platforms.
 
 # Later: Test the exports on multiple platforms.
 """
-import platform
+from sys import platform
 
 # Data
-system = platform.system()
+system = 'Windows' if platform == 'win32' else platform # #Note: sys.platform is used instead of platform.system, as the module, platform is costly to import.
 
 if system != 'Windows':
 	from os import unlink
@@ -23,7 +23,6 @@ if system != 'Windows':
 
 else:
 	from os.path import abspath, isdir
-	from win32com.shell import shell
 	from win32file import FILE_ATTRIBUTE_DIRECTORY, GetFileAttributes
 	from win32file import CreateHardLink, CreateSymbolicLink, RemoveDirectory as rmlink #pylint: disable=W0611
 
@@ -51,10 +50,6 @@ else:
 		return result > -1 and result & REPARSE_FOLDER == REPARSE_FOLDER
 
 	# #Pending: Create a standard API for the following functions, across platforms.
-	import pythoncom
-	import win32con
-	from win32api import SetFileAttributes
-
 	def setAttrs(target, *Attrs):
 		r"""Sets the given attributes to the given target.
 
@@ -62,6 +57,9 @@ else:
 			target  (path): The target path to set the attributes.
 			*Attrs : One or more attribute names of the `SetFileAttributes <https://msdn.microsoft.com/en-us/library/windows/desktop/aa365535(v=vs.85).aspx>`_ function without the preceeding *FILE_ATTRIBUTE_*.
 		"""
+		import win32con
+		from win32api import SetFileAttributes
+
 		attr = 0
 		for item in Attrs:
 			attr = attr | getattr(win32con, 'FILE_ATTRIBUTE_%s' % item.upper())
@@ -69,6 +67,9 @@ else:
 		SetFileAttributes(target, attr)
 
 	def createShortcut(toDocPath, fromLinkPath):
+		import pythoncom
+		from win32com.shell import shell
+
 		shortcut = pythoncom.CoCreateInstance(
 			shell.CLSID_ShellLink,
 			None,
@@ -39,10 +39,11 @@ def collectConfigData(Attrs):
 	r"""Collects the config from various sources and builds the Config.
 	"""
 	from laufire.yamlex import YamlEx
+	from laufire.parser import parseYAML
 
 	configPath = Attrs.get('configPath')
 
-	Config = YamlEx(configPath, loglevel='ERROR') if configPath else YamlEx(loglevel='ERROR')
+	Config = parseYAML(configPath, interpolate=False, loglevel='ERROR') if configPath else YamlEx(loglevel='ERROR') # #Note: The config is interpolated only after being extended.
 
 	if 'ConfigExtensions' in Attrs:
 		Config.extend(Attrs['ConfigExtensions'])
@@ -0,0 +1,264 @@
+r"""
+interpolator
+============
+
+	Interpolates the templates within the values of routed dictionaries (ex: {'Paths/temp': '{{ Paths.base }}/temp'}), while tracking the dependencies between the routes.
+
+Notes
+-----
+
+	* Every template is parsed only once. The routes referred by the templates are collected from their syntax trees, so to render the values in the order of their dependencies, only once each.
+	* When a value is changed, only its dependents are re-rendered.
+	* The templates are rendered with the environment of YamlEx. Hence, the undefined variables are left as they are.
+	* Cyclic references aren't resolved. The values in the cycles are rendered once, in no particular order.
+	* The strings nested within dict and list values are rendered as well, into copies of the values.
+"""
+from bisect import bisect_left, insort
+from copy import deepcopy
+
+from jinja2 import nodes, TemplateError
+
+from laufire.extensions import nest
+from laufire.yamlex import getEnvironment, hasMarkers, needsRendering
+
+# Helpers
+def collectReferences(Node, References):
+	r"""Collects the routes referred by the given template node, into the given set.
+	"""
+	Chain = []
+	Current = Node
+
+	while isinstance(Current, (nodes.Getattr, nodes.Getitem)):
+		if isinstance(Current, nodes.Getattr):
+			Chain.append(Current.attr)
+
+		elif isinstance(Current.arg, nodes.Const):
+			Chain.append(unicode(Current.arg.value))
+
+		else: # A dynamic index. Hence, depend on the whole of the indexed value.
+			Chain = []
+			collectReferences(Current.arg, References)
+
+		Current = Current.node
+
+	if isinstance(Current, nodes.Name):
+		if Current.ctx == 'load':
+			Chain.append(Current.name)
+			Chain.reverse()
+			References.add('/'.join(Chain))
+
+		return
+
+	for Child in Current.iter_child_nodes():
+		collectReferences(Child, References)
+
+def collectStrings(value, Keys, Strings):
+	r"""Collects the (keys, string) pairs of the given value and of the strings nested within its dicts and lists.
+	"""
+	if isinstance(value, basestring):
+		Strings.append((Keys, value))
+
+	elif hasattr(value, 'iteritems'):
+		for key, Child in value.iteritems():
+			collectStrings(Child, Keys + (key,), Strings)
+
+	elif isinstance(value, list):
+		for i, Child in enumerate(value):
+			collectStrings(Child, Keys + (i,), Strings)
+
+	return Strings
+
+def setNested(Container, Keys, value):
+	for key in Keys[:-1]:
+		Container = Container[key]
+
+	Container[Keys[-1]] = value
+
+def getLineage(route):
+	Parts = route.split('/')
+
+	return ['/'.join(Parts[:i]) for i in range(1, len(Parts) + 1)]
+
+# Exports
+class Interpolator:
+	r"""Interpolates the given routed dictionary.
+
+	Args:
+		Values (dict): A dictionary of {route: value}. The dictionary is copied. The interpolated values are available through the attr, Values.
+		environment (jinja2.Environment): The environment to parse the templates with. Defaults to that of YamlEx.
+	"""
+	def __init__(self, Values, environment=None):
+		self._environment = environment or getEnvironment()
+		self.Values = Values = dict(Values)
+		self._Context = nest(Values)
+		self._Routes = sorted(Values.keys())
+		self._Templates = {} # {route: ([(keys, Template, source)], References, source value)}
+		self._Watchers = {} # {referred route: set(template routes)}
+
+		for route, value in Values.iteritems():
+			self._addTemplate(route, value)
+
+		self._render(self._Templates.keys())
+
+	def __getitem__(self, route):
+		return self.Values[route]
+
+	def set(self, route, value):
+		r"""Sets the given value and re-renders the dependents. Returns the rendered value.
+		"""
+		Values = self.Values
+
+		self._removeTemplate(route)
+
+		if route not in Values:
+			insort(self._Routes, route)
+
+		Values[route] = value
+		self._setContext(route, value)
+		self._addTemplate(route, value)
+
+		Affected = self._getDependents(route)
+
+		if route in self._Templates:
+			Affected.add(route)
+
+		self._render(Affected)
+
+		return Values[route]
+
+	def _addTemplate(self, route, value):
+		Parts = [] # [(keys, Template, source)] of the templates within the value.
+		References = set()
+
+		for Keys, string in collectStrings(value, (), []):
+			if not needsRendering(string):
+				continue
+
+			try:
+				Tree = self._environment.parse(string)
+
+			except TemplateError as e:
+				raise Exception('Failed parsing the template of the route "%s": %s' % (route, e))
+
+			collectReferences(Tree, References)
+			Parts.append((Keys, self._environment.from_string(Tree), string))
+
+		if not Parts:
+			return
+
+		self._Templates[route] = (Parts, References, value)
+
+		for reference in References:
+			self._Watchers.setdefault(reference, set()).add(route)
+
+	def _removeTemplate(self, route):
+		Template = self._Templates.pop(route, None)
+
+		if Template:
+			for reference in Template[1]:
+				self._Watchers[reference].discard(route)
+
+	def _getDependencies(self, route):
+		r"""Returns the template routes, that the given template route depends upon.
+		"""
+		Routes = self._Routes
+		Templates = self._Templates
+		Dependencies = set()
+
+		for reference in Templates[route][1]:
+			Dependencies.update(r for r in getLineage(reference) if r in Templates) # The reference itself or the values that hold it.
+
+			prefix = '%s/' % reference
+			i = bisect_left(Routes, prefix)
+
+			while i < len(Routes) and Routes[i].startswith(prefix): # The descendants of the reference.
+				if Routes[i] in Templates:
+					Dependencies.add(Routes[i])
+
+				i += 1
+
+		Dependencies.discard(route)
+
+		return Dependencies
+
+	def _getDependents(self, route):
+		r"""Returns the template routes, that depend upon the given route, directly or indirectly.
+		"""
+		Watchers = self._Watchers
+		Dependents = set()
+		Pending = [route]
+
+		while Pending:
+			current = Pending.pop()
+			prefix = '%s/' % current
+			References = getLineage(current) + [r for r in Watchers if r.startswith(prefix)]
+
+			for reference in References:
+				for dependent in Watchers.get(reference, ()):
+					if dependent not in Dependents:
+						Dependents.add(dependent)
+						Pending.append(dependent)
+
+		Dependents.discard(route)
+
+		return Dependents
+
+	def _render(self, Routes):
+		r"""Renders the given template routes, after rendering their dependencies.
+		"""
+		Pending = set(Routes)
+		Visiting = set()
+
+		def visit(route):
+			if route not in Pending or route in Visiting: # The route is either rendered, or is in a cycle.
+				return
+
+			Visiting.add(route)
+
+			for dependency in self._getDependencies(route):
+				visit(dependency)
+
+			Pending.discard(route)
+			self._renderRoute(route)
+
+		for route in list(Pending):
+			visit(route)
+
+	def _renderRoute(self, route):
+		Context = self._Context
+		Parts, dummy, value = self._Templates[route]
+		rendered = deepcopy(value) if Parts[0][0] else None # Nested templates are rendered into a copy, so to keep the source for re-rendering.
+
+		try:
+			for Keys, Template, string in Parts:
+				renderedString = Template.render(Context)
+
+				while renderedString != string and hasMarkers(renderedString): # Rendered values could hold templates, as well.
+					string = renderedString
+					renderedString = self._environment.from_string(string).render(Context)
+
+				if Keys:
+					setNested(rendered, Keys, renderedString)
+
+				else:
+					rendered = renderedString
+
+		except TemplateError as e:
+			raise Exception('Failed rendering the route "%s": %s' % (route, e))
+
+		self.Values[route] = rendered
+		self._setContext(route, rendered)
+
+	def _setContext(self, route, value):
+		Parts = route.split('/')
+		Current = self._Context
+
+		for part in Parts[:-1]:
+			Child = Current.get(part)
+
+			if not hasattr(Child, 'iteritems'):
+				Current[part] = Child = {}
+
+			Current = Child
+
+		Current[Parts[-1]] = value
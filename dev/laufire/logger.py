@@ -6,28 +6,45 @@ The reason for a custom module is due to different preferences in the output lev
 
 import logging
 
-from colorama import Fore, Style, init as colorama_init
-
 # Delegates
 Logger = logging.getLogger('<unnamed>')
+Handler = logging.StreamHandler()
 
 # Exports
 __all__ = ['log', 'logError', 'debug']
 
-# Data
-BRED = '%s%s' % (Style.BRIGHT, Fore.RED) #pylint: disable=E1101
-
 # State
 Supressed = []
+Fore = None # #Note: colorama is loaded on the first colored log, to keep the module cheap to import.
+BRED = None
+
+# Helpers
+def loadColors():
+	global Fore, BRED
+
+	import sys
+	from colorama import Fore as _Fore, Style, init as colorama_init
+
+	colorama_init(autoreset=True)
+	Handler.stream = sys.stderr # Write through the stream wrapped by colorama.
+
+	BRED = '%s%s' % (Style.BRIGHT, _Fore.RED) #pylint: disable=E1101
+	Fore = _Fore
 
 def log(message, color=None):
 	r"""Facilitates colored logging.
 	"""
+	if color and not Fore:
+		loadColors()
+
 	Logger.info('%s%s' % (getattr(Fore, color, 'WHITE'), message) if color else message)
 
 def logError(message):
 	r"""Logs an error.
 	"""
+	if not BRED:
+		loadColors()
+
 	Logger.error('%s%s\n' % (BRED, message)) #pylint: disable=W1201
 
 def dump(message):
@@ -57,12 +74,14 @@ def setup(Project):
 	setLevel(Project.logLevel)
 
 def init():
-	colorama_init(autoreset=True)
+	from sys import modules
+
+	Initializer = modules.get('laufire.initializer') # #Note: The initializer isn't imported here, as the projects are set up only through it. When it's initialized later, it sets up the logger, itself.
 
-	from laufire.initializer import loadProjectSettings
-	loadProjectSettings(setup)
+	if Initializer:
+		Initializer.loadProjectSettings(setup)
 
-	Logger.addHandler(logging.StreamHandler())
+	Logger.addHandler(Handler)
 	Logger.setLevel(logging.INFO)
 
 init()
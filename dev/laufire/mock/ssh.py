@@ -4,29 +4,113 @@ A module to help with development.
 import json
 
 from laufire.dev import getPretty
-from laufire.filesys import basename, copy, ensureParent, joinPaths
+from laufire.filesys import basename, collectPaths, copy, copyContents, copyTimes, ensureDir, ensureParent, isContainer, isfile, isSameFile, joinPaths, packTree, pair
 from laufire.flow import rob
 from laufire.logger import debug
-from laufire.shell import call, debugCall, assertShell
+from laufire.shell import call, debugCall, assertShell, readAll, stream
 
 # Helpers
 def getTgtName(tgtName, srcPath):
 	return tgtName if tgtName else basename(srcPath)
 
+def copyDelta(srcPath, tgtPath, workers=None, useMD5=False):
+	r"""Stands for ssh.uploadDelta, by copying only the missing and the changed files. As with uploadDelta, the target paths missing in the source are kept.
+	"""
+	Pairs = []
+	ensureDir(tgtPath)
+
+	for path, pathType in collectPaths(srcPath):
+		if pathType != 1:
+			ensureDir(joinPaths(tgtPath, path))
+
+		else:
+			Pair = pair(srcPath, tgtPath, path)
+
+			if not (isfile(Pair[1]) and isSameFile(Pair[0], Pair[1], useMD5)):
+				Pairs.append(Pair)
+
+	debug('uploading %d files' % len(Pairs))
+	copyContents(Pairs, workers)
+
+	for Pair in Pairs:
+		copyTimes(*Pair)
+
 class SSHClientMocker:
+	r"""Stands for ssh.SSHClient, by executing the commands locally. It accepts both Configs and SSHConfigs.
+	"""
 	def __init__(self, Config):
-		Paths = Config['Gateway']['Paths']
-		self.mockBase = Paths['base']
+		Paths = Config.get('Gateway', {}).get('Paths', {})
+		self.mockBase = Paths.get('base')
+
+	def execute(self, command, onOutput=None, **KWArgs):
+		if not onOutput:
+			return call(command, **KWArgs)
+
+		Output = {'out': [], 'err': []}
+		Result = {}
+
+		for name, text in stream(command, Result=Result, **KWArgs):
+			Output[name].append(text)
+			onOutput(name, text)
 
-	def execute(self, command, **KWArgs):
-		return call(command, **KWArgs)
+		return {'out': u''.join(Output['out']), 'err': u''.join(Output['err']), 'code': Result['code']}
 
-	def upload(self, srcPath, tgtPath): # #Note: Uploads are done always to the temp dir.
+	def isActive(self): #pylint: disable=no-self-use
+		return True
+
+	def close(self):
+		pass
+
+	def upload(self, srcPath, tgtPath, workers=None, delta=False, useMD5=False, archive=False, compressLevel=6): # #Note: Uploads are done always to the temp dir.
 		debug('uploading %s -> %s' % (srcPath, tgtPath))
 		ensureParent(tgtPath)
-		return copy(srcPath, tgtPath)
+
+		if archive and isContainer(srcPath):
+			self.uploadArchive(srcPath, tgtPath, compressLevel)
+			return tgtPath
+
+		if delta and isContainer(srcPath):
+			copyDelta(srcPath, tgtPath, workers, useMD5)
+			return tgtPath
+
+		return copy(srcPath, tgtPath, workers=workers)
+
+	def uploadArchive(self, srcPath, tgtPath, compressLevel=6): #pylint: disable=no-self-use
+		r"""Stands for ssh.uploadArchive, by piping the tar stream into a local tar.
+		"""
+		from subprocess import Popen, PIPE
+		from threading import Thread
+		from laufire.ssh import getExtractCommand
+
+		Process = Popen(getExtractCommand(tgtPath, compressLevel), shell=True, stdin=PIPE, stderr=PIPE)
+		Err = []
+
+		reader = Thread(target=readAll, args=(Process.stderr, Err)) # #Note: stderr is drained while the stream is being written, so that tar won't block on it.
+		reader.daemon = True
+		reader.start()
+
+		size = packTree(srcPath, Process.stdin, compressLevel=compressLevel)
+		Process.stdin.close()
+		code = Process.wait()
+		reader.join()
+
+		if code:
+			raise Exception('Failed extracting the archive to %s: %s' % (tgtPath, ''.join(Err)))
+
+		debug('transferred %d bytes' % size)
+
+		return size
 
 # Exports
+def executeMany(SSHConfigs, commandTpl, **KWArgs):
+	r"""Stands for ssh.executeMany, by executing the commands locally.
+	"""
+	from laufire.ssh import executeMany as _executeMany
+
+	KWArgs.setdefault('clientFactory', SSHClientMocker)
+
+	return _executeMany(SSHConfigs, commandTpl, **KWArgs)
+
 class SSHBridgeMocker:
 	r"""A class to help with the development of gateway scripts, by executing the commands locally.
 
@@ -68,11 +152,11 @@ class SSHBridgeMocker:
 		"""
 		debugCall(self.mockScriptTpl % ecCommand)
 
-	def upload(self, srcPath, tgtPath=''):
+	def upload(self, srcPath, tgtPath='', **KWArgs):
 		if not tgtPath:
 			tgtPath = joinPaths(self.Config['Gateway']['Paths']['temp'], getTgtName(None, srcPath))
 
 		else:
 			tgtPath = tgtPath.format(**self.Config['Gateway'])
 
-		return self.Client.upload(srcPath, tgtPath)
+		return self.Client.upload(srcPath, tgtPath, **KWArgs)
@@ -3,22 +3,23 @@ A module with constructors for mockable objects and their mocks.
 """
 
 # State
-Gateway = None
+Gateways = {} # {(shouldMock, host, username, Pool): Gateway}
 
-def getGateway(Config, shouldMock, cached=True):
+def getGateway(Config, shouldMock, cached=True, Pool=None):
 	r"""
 	Returns a Gateway according to the passed params.
 
 	Args:
 		Config (dict): The Config as expected (should have SSH, Gateway and Mock configs).
 		shouldMock (bool): Returns the mocker when set to True.
-		cached (bool): Shares a cached Gateway instead of creating a new one with every call.
+		cached (bool): Shares a cached Gateway (one per host, user and pool) instead of creating a new one with every call.
+		Pool (ssh.SSHPool): The pool for the SSHBridges to share their clients through.
 	"""
-	if cached:
-		global Gateway
+	SSHConfig = Config.get('SSH') or {}
+	key = (bool(shouldMock), SSHConfig.get('host'), SSHConfig.get('username'), Pool) # #Note: The pool is a part of the key, so that the Gateways cached without a pool (or with another) won't be handed out.
 
-		if Gateway:
-			return Gateway
+	if cached and key in Gateways:
+		return Gateways[key]
 
 	if shouldMock:
 		from laufire.mock.ssh import SSHBridgeMocker
@@ -26,6 +27,9 @@ def getGateway(Config, shouldMock, cached=True):
 
 	else:
 		from laufire.ssh import SSHBridge
-		Gateway = SSHBridge(Config)
+		Gateway = SSHBridge(Config, Pool)
+
+	if cached:
+		Gateways[key] = Gateway
 
 	return Gateway
@@ -4,37 +4,177 @@ parse
 
 A set of functions to parse data files of various data formats.
 
+Parsed data are cached, keyed by the path, the mtime and the size of the files. Hence, parsing an unchanged file again, only costs a stat and an unpickle (every call gets its own copy of the data). The cache could also be persisted as sidecar files (<file>.<format>.pickle), so that warm starts skip parsing completely.
+
+#Note: As unpickling could execute code, sidecars are loaded only when they are owned by the current user, aren't writable by others and aren't older than their sources. They are written as readable only by their owners.
+
 #ToDo: Allow KWArgs to the parsers, so to make configuring possible, especially to turn-off templating.
 """
-from os.path import splitext
+import os
+
+from os import stat, rename, remove
+from os.path import splitext, abspath
+
+try:
+	import cPickle as pickle
+
+except ImportError:
+	import pickle
+
+# State
+ParseCache = {} # {(path, format): (stamp, pickled data)}
+YAMLLoader = None
 
 # Helpers
 def getParser(filePath):
 	return ParserMap[splitext(filePath)[1][1:].lower()]
 
-# Exports
-def parseYAML(filePath):
+def getYAMLLoader():
+	r"""Returns an OrderedDict loader, based on the C LibYAML parser when available, else on that of HiYaPyCo.
+	"""
+	global YAMLLoader
+
+	if YAMLLoader:
+		return YAMLLoader
+
+	import yaml
+	from hiyapyco.odyldo import ODYL
+
+	if not getattr(yaml, '__with_libyaml__', False):
+		YAMLLoader = ODYL
+		return YAMLLoader
+
+	class CODYL(yaml.CSafeLoader): #pylint: disable=E1101
+		r"""An OrderedDict loader, using LibYAML for parsing.
+		"""
+		def __init__(self, *args, **kwargs):
+			yaml.CSafeLoader.__init__(self, *args, **kwargs) #pylint: disable=E1101
+
+			for mapping in ('tag:yaml.org,2002:map', 'tag:yaml.org,2002:omap'):
+				self.add_constructor(mapping, type(self)._odyload)
+
+		_odyload = ODYL.__dict__['_odyload']
+		construct_mapping = ODYL.__dict__['construct_mapping']
+
+	YAMLLoader = CODYL
+
+	return YAMLLoader
+
+def loadYAML(filePath, interpolate=True, **KWArgs):
+	r"""Loads the data from the given YAML file. The KWArgs are passed to YamlEx.
+	"""
+	import yaml
 	from laufire.yamlex import YamlEx
 
-	Data = YamlEx(filePath)
-	Data.interpolate()
+	with open(filePath, 'rb') as file:
+		Docs = list(yaml.load_all(file, getYAMLLoader()))
+
+	Loaded = YamlEx(filePath, interpolate=False, **KWArgs) if len(Docs) != 1 else YamlEx(**KWArgs).setData(Docs[0]) # Let HiYaPyCo merge multiple documents.
 
-	return Data
+	return (Loaded.interpolate() if interpolate else Loaded).Data
 
-def parseJSON(filePath):
+def loadRawYAML(filePath):
+	return loadYAML(filePath, False)
+
+def loadJSON(filePath):
 	import json
 
 	with open(filePath, 'r') as file:
 		return json.load(file)
 
-def parse(filePath, format=None):
+def isTrusted(filePath, Source):
+	r"""Checks whether the given sidecar could be trusted to be unpickled. ie: It's owned by the current user, isn't writable by others and isn't older than the given source (stat).
+	"""
+	Stat = stat(filePath)
+
+	if hasattr(os, 'getuid') and Stat.st_uid != os.getuid(): #pylint: disable=no-member
+		return False
+
+	return not Stat.st_mode & 0o022 and Stat.st_mtime >= Source.st_mtime
+
+def readSidecar(sidecarPath, stamp, Source):
+	try:
+		if not isTrusted(sidecarPath, Source):
+			return
+
+		with open(sidecarPath, 'rb') as file:
+			if pickle.load(file) == stamp:
+				return file.read()
+
+	except Exception: #pylint: disable=W0703
+		pass # #Note: Missing or invalid sidecars are simply ignored.
+
+def writeSidecar(sidecarPath, stamp, pickled):
+	tempPath = '%s.tmp' % sidecarPath
+
+	try:
+		if os.path.exists(tempPath):
+			remove(tempPath)
+
+		with os.fdopen(os.open(tempPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600), 'wb') as file: # #Note: Only the owner could read or write the sidecar.
+			pickle.dump(stamp, file, pickle.HIGHEST_PROTOCOL)
+			file.write(pickled)
+
+		rename(tempPath, sidecarPath) # #Note: The sidecar is replaced atomically, so that concurrent readers won't see partial data.
+
+	except (IOError, OSError):
+		try:
+			remove(tempPath)
+
+		except OSError:
+			pass
+
+def getParsed(filePath, format, load, sidecar):
+	r"""Returns a fresh copy of the parsed data of the given file, from the cache when the file is unchanged.
+	"""
+	filePath = abspath(filePath)
+	Stat = stat(filePath)
+	stamp = (Stat.st_mtime, Stat.st_size)
+	key = (filePath, format)
+	Cached = ParseCache.get(key)
+
+	if Cached and Cached[0] == stamp:
+		pickled = Cached[1]
+
+	else:
+		sidecarPath = '%s.%s.pickle' % (filePath, format)
+		pickled = readSidecar(sidecarPath, stamp, Stat) if sidecar else None
+
+		if pickled is None:
+			pickled = pickle.dumps(load(filePath), pickle.HIGHEST_PROTOCOL)
+
+			if sidecar:
+				writeSidecar(sidecarPath, stamp, pickled)
+
+		ParseCache[key] = (stamp, pickled)
+
+	return pickle.loads(pickled)
+
+# Exports
+def parseYAML(filePath, sidecar=False, interpolate=True, **KWArgs):
+	r"""Parses the given YAML file into a YamlEx. The KWArgs (ex: loglevel) are passed to YamlEx.
+	"""
+	from laufire.yamlex import YamlEx
+
+	load = (lambda path: loadYAML(path, interpolate, **KWArgs)) if KWArgs else (loadYAML if interpolate else loadRawYAML)
+
+	return YamlEx(**KWArgs).setData(getParsed(filePath, 'yaml' if interpolate else 'raw-yaml', load, sidecar))
+
+def parseJSON(filePath, sidecar=False):
+	return getParsed(filePath, 'json', loadJSON, sidecar)
+
+def parse(filePath, format=None, sidecar=False):
 	r"""Parses data from the diven file.
 
 	Args:
 		filePath (str): The path to process.
 		format (str): The format of the file. When not given, it is detected based on the files extension. For supported formats check the var ParserMap.
+		sidecar (bool): Persists the parsed data as a sidecar file (<filePath>.<format>.pickle), to be reused by later processes, until the file changes.
 	"""
-	return (ParserMap[format] if format else getParser(filePath))(filePath)
+	return (ParserMap[format] if format else getParser(filePath))(filePath, sidecar)
+
+def clearParseCache():
+	ParseCache.clear()
 
 # Data
 ParserMap = {'yml': parseYAML, 'yaml': parseYAML, 'json': parseJSON}
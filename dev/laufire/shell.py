@@ -1,23 +1,148 @@
 r"""A module to help with shell calls.
 
-# #Note: The processes with huge amounts of stdout or stderr could hang.
+# #Note: The processes with huge amounts of stdout or stderr could hang. Use stream with such processes.
 """
 import sys
 import os
 
+from collections import deque
 from subprocess import Popen, PIPE
 from shlex import split as shlexSplit
 
-from laufire.dev import getPretty
 from laufire.logger import debug, dump
 
+# Data
+readerJoinTimeout = 1 # Seconds to wait for the pipe readers of the killed processes.
+
 # State
 split = None
 
 # Helpers
+def getPretty(Data):
+	from laufire.dev import getPretty as _getPretty # #Note: laufire.dev is imported lazily, to keep the module cheap to import.
+
+	return _getPretty(Data)
+
 def getNthLine(string, N):
 	return string.strip().split('\n')[N]
 
+def readPipe(pipe, name, Queue, lines, chunkSize, encoding):
+	r"""Reads the given pipe into the given queue, till its end. A None marks the end.
+	"""
+	from codecs import getincrementaldecoder
+
+	decode = getincrementaldecoder(encoding)('replace').decode # #Note: An incremental decoder is used, as chunks could split multi-byte characters.
+
+	try:
+		Reads = iter(pipe.readline, b'') if lines else iter(lambda: os.read(pipe.fileno(), chunkSize), b'')
+
+		for data in Reads:
+			text = decode(data)
+
+			if text:
+				Queue.put((name, text))
+
+		text = decode(b'', True)
+
+		if text:
+			Queue.put((name, text))
+
+	finally:
+		pipe.close()
+		Queue.put((name, None))
+
+def readAll(pipe, Buffer):
+	Buffer.append(pipe.read())
+	pipe.close()
+
+def restoreSIGPIPE():
+	import signal
+
+	signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+def pipeline(Commands, **KWArgs):
+	r"""Runs the given commands concurrently, with the stdout of each stage connected to the stdin of the next.
+	"""
+	from threading import Thread
+
+	if os.name != 'nt':
+		KWArgs.setdefault('preexec_fn', restoreSIGPIPE) # #Note: Python ignores SIGPIPE and its children inherit it. Hence the early stages won't stop, when the latter ones exit.
+
+	Processes = []
+	Errs = []
+	Readers = []
+	stdin = PIPE
+	completed = False
+
+	try:
+		for command in Commands:
+			debug(command)
+
+			p = Popen(split(command), stdin=stdin, stdout=PIPE, stderr=PIPE, **KWArgs)
+
+			if Processes:
+				Processes[-1].stdout.close() # Let the previous stage receive SIGPIPE, when this stage exits early.
+
+			else:
+				p.stdin.close() # The first stage gets no input.
+
+			Processes.append(p)
+			stdin = p.stdout
+
+			Err = []
+			Errs.append(Err)
+			reader = Thread(target=readAll, args=(p.stderr, Err)) # #Note: stderr is drained by threads, so that no stage would block on it.
+			reader.daemon = True
+			reader.start()
+			Readers.append(reader)
+
+		out = Processes[-1].stdout.read()
+		Processes[-1].stdout.close()
+		completed = True
+
+	finally:
+		for p in Processes:
+			if not completed: # The pipeline was interrupted (even while being set up).
+				killProcess(p)
+				p.stdout.close()
+
+			p.wait()
+
+		if not completed:
+			for p, reader in zip(Processes, Readers):
+				reader.join(readerJoinTimeout)
+
+				if not reader.is_alive():
+					p.stderr.close()
+
+	for reader in Readers:
+		reader.join()
+
+	Codes = [p.returncode for p in Processes]
+	failed = max([i for i, code in enumerate(Codes) if code] or [len(Codes) - 1])
+
+	return {'out': out, 'err': Errs[failed][0], 'code': Codes[failed], 'Codes': Codes}
+
+class Tail:
+	r"""A bounded buffer, that keeps only the last given number of characters of a stream.
+	"""
+	def __init__(self, size):
+		self.size = size
+		self._Pieces = deque()
+		self._length = 0
+
+	def append(self, text):
+		Pieces = self._Pieces
+
+		Pieces.append(text)
+		self._length += len(text)
+
+		while self._length - len(Pieces[0]) >= self.size: # Drop the pieces, that are beyond the size.
+			self._length -= len(Pieces.popleft())
+
+	def getvalue(self):
+		return u''.join(self._Pieces)[-self.size:]
+
 # Exports
 def run(command, **KWArgs):
 	r"""Starts a process, waits till the process completes and returns the return-code.
@@ -46,13 +171,22 @@ def call(command, **KWArgs): # from gitapi.py
 	return {'out': out, 'err': err, 'code': p.returncode}
 
 def piped(*Commands, **KWArgs):
-	r"""Emulates piped commands in *nix systems. Returns a dictionary with the final return-code, stdout and a stderr.
+	r"""Emulates piped commands in *nix systems. Returns a dictionary with the final return-code, stdout and a stderr, along with the return-codes of the stages (Codes).
+
+	Args:
+		concurrent (bool): Connects the stages through OS pipes and runs them in parallel, instead of running them one after another, while holding the intermediate outputs in memory. The return-code is that of the last failing stage, as with pipefail.
 	"""
+	concurrent = KWArgs.pop('concurrent', False)
+
 	dump(getPretty(KWArgs))
 
+	if concurrent:
+		return pipeline(Commands, **KWArgs)
+
 	out = None
 	err = None
 	code = 0
+	Codes = []
 
 	for command in Commands:
 		debug(command)
@@ -60,11 +194,12 @@ def piped(*Commands, **KWArgs):
 		p = Popen(split(command), stdout=PIPE, stderr=PIPE, stdin=PIPE, **KWArgs)
 		out, err = p.communicate(out)
 		code = p.returncode
+		Codes.append(code)
 
 		if code:
 			break
 
-	return {'out': out, 'err': err, 'code': code}
+	return {'out': out, 'err': err, 'code': code, 'Codes': Codes}
 
 def writable(command, data, **KWArgs):
 	r"""Opens a process and writes the given data to its STDIN.
@@ -103,6 +238,149 @@ def launch(command, **KWArgs):
 
 	return Popen(split(command), stdout=PIPE, stderr=PIPE, **KWArgs)
 
+def stream(command, lines=True, tailSize=None, Result=None, chunkSize=4096, encoding='utf-8', **KWArgs):
+	r"""Starts a process and yields its output as it arrives, as tuples of (streamName, text). The stream names are 'out' and 'err'.
+
+	Args:
+		lines (bool): Yields the output line by line, when True, else in chunks of (at most) chunkSize bytes.
+		tailSize (int): Keeps the last tailSize characters of stdout and stderr.
+		Result (dict): When given, it's filled with the return-code and the tails of the streams ({'out', 'err', 'code'}), so that it could be passed to assertShell, once the stream is exhausted.
+
+	#Note: Both the pipes are drained concurrently (by threads), hence the process won't block on either of them.
+	#Note: The process is killed, when the stream is closed before its end.
+	"""
+	from threading import Thread
+	from Queue import Queue
+
+	debug(command)
+	dump(getPretty(KWArgs))
+
+	p = Popen(split(command), stdout=PIPE, stderr=PIPE, **KWArgs)
+	Output = Queue()
+	Tails = {'out': Tail(tailSize), 'err': Tail(tailSize)} if tailSize else None
+
+	Readers = [Thread(target=readPipe, args=(pipe, name, Output, lines, chunkSize, encoding)) for name, pipe in (('out', p.stdout), ('err', p.stderr))]
+
+	for reader in Readers:
+		reader.daemon = True
+		reader.start()
+
+	try:
+		openCount = 2
+
+		while openCount:
+			name, text = Output.get()
+
+			if text is None:
+				openCount -= 1
+				continue
+
+			if Tails:
+				Tails[name].append(text)
+
+			yield name, text
+
+		p.wait()
+
+	finally:
+		if p.poll() is None: # The stream was closed prematurely.
+			p.kill()
+			p.wait()
+
+			for reader in Readers:
+				reader.join(readerJoinTimeout) # #Note: The readers could outlive the process, when its children hold the pipes.
+
+		if Result is not None:
+			Result.update({'out': Tails['out'].getvalue() if Tails else u'', 'err': Tails['err'].getvalue() if Tails else u'', 'code': p.returncode})
+
+def runMany(Commands, concurrency=4, timeout=None, failFast=False, **KWArgs):
+	r"""Runs the given commands concurrently, with at most the given number of processes at a time. Returns a list of dictionaries like those of call (with an extra key, timedOut), in the order of the commands.
+
+	Args:
+		concurrency (int): The maximum number of processes to run at a time.
+		timeout (float): The seconds each process is allowed to run. The processes that exceed it are killed.
+		failFast (bool): Stops launching the remaining commands after the first failure, and kills the running ones. The results of the commands that weren't launched are None.
+	"""
+	from threading import Lock, Timer
+
+	dump(getPretty(KWArgs))
+
+	Running = set()
+	TimedOut = set()
+	State = {'failed': False}
+	lock = Lock()
+
+	def expire(p):
+		TimedOut.add(p)
+		killProcess(p)
+
+	def abort():
+		State['failed'] = True
+
+		for other in Running:
+			killProcess(other)
+
+	def worker(command):
+		with lock: # #Note: Processes are launched within the lock, so that none would escape the kills of failFast.
+			if State['failed']:
+				return None
+
+			debug(command)
+
+			try:
+				p = Popen(split(command), stdout=PIPE, stderr=PIPE, **KWArgs)
+
+			except Exception:
+				abort() # The commands can't be run as a whole. Hence, the running ones are killed and the rest aren't launched.
+				raise
+
+			Running.add(p)
+
+		timer = Timer(timeout, expire, (p,)) if timeout else None
+
+		if timer:
+			timer.daemon = True
+			timer.start()
+
+		out, err = [x.decode('utf-8') for x in p.communicate()]
+
+		if timer:
+			timer.cancel()
+
+		Result = {'out': out, 'err': err, 'code': p.returncode, 'timedOut': p in TimedOut}
+
+		with lock:
+			Running.discard(p)
+
+			if failFast and Result['code'] and not State['failed']:
+				abort()
+
+		return Result
+
+	if concurrency > 1 and len(Commands) > 1:
+		from multiprocessing.pool import ThreadPool
+
+		Pool = ThreadPool(min(concurrency, len(Commands)))
+
+		try:
+			Results = list(Pool.imap(worker, Commands)) # #Note: imap is used over map, as it hands out the commands one by one.
+
+		finally:
+			Pool.close()
+			Pool.join()
+
+	else:
+		Results = [worker(command) for command in Commands]
+
+	return Results
+
+def killProcess(p):
+	try:
+		p.kill()
+
+	except OSError: # The process has already exited.
+		pass
+
 def getProcessData(p):
 	r"""Gets the process data from the given process. Could be used with launch, to get the processes'es output.
 	"""
@@ -1,7 +1,18 @@
 import sqlite3
 
+from contextlib import contextmanager
+
 # #Pending: Raise exceptions on constraint failures etc.
 
+# Data
+supportsUpsert = sqlite3.sqlite_version_info >= (3, 24, 0)
+
+Profiles = { # Named sets of pragmas, applied in order, when the connections are opened.
+	'bulk-load': [('journal_mode', 'WAL'), ('synchronous', 'OFF'), ('cache_size', -262144), ('temp_store', 'MEMORY')], # Fast writes, at the risk of losing the latest commits on OS crashes.
+	'concurrent-read': [('journal_mode', 'WAL'), ('synchronous', 'NORMAL'), ('mmap_size', 268435456), ('cache_size', -65536), ('temp_store', 'MEMORY')], # Readers do not block the writer and vice versa.
+	'durable': [('journal_mode', 'WAL'), ('synchronous', 'FULL')], # Every commit is synced to the disk.
+}
+
 # Helpers
 def dictFactory(cursor, row):
 	d = {}
@@ -10,6 +21,18 @@ def dictFactory(cursor, row):
 
 	return d
 
+def getPragmas(profile=None, pragmas=None):
+	r"""Returns the list of (name, value) pragmas from the given profile name and the given pragmas (dict / list of pairs), with the latter overriding the former.
+	"""
+	Pragmas = list(Profiles[profile]) if profile else []
+
+	if pragmas:
+		Overrides = pragmas.items() if hasattr(pragmas, 'items') else pragmas
+		Names = set(name for name, dummy in Overrides)
+		Pragmas = [Pragma for Pragma in Pragmas if Pragma[0] not in Names] + list(Overrides)
+
+	return Pragmas
+
 # Exports
 def execute(filePath, query, useDict=False):
 	r"""Executes the given query over the given DB and returns the results, if any.
@@ -18,13 +41,16 @@ def execute(filePath, query, useDict=False):
 	return DB.execute(query).fetchall()
 
 class SQLiteDB:
-	def __init__(self, filePath=':memory:', useDict=False):
+	def __init__(self, filePath=':memory:', useDict=False, profile=None, pragmas=None, **ConnectArgs):
 		r"""
 		A simple wrapper over native sqlite3, to ease development.
 
 		Args:
 			filePath (str): The path to the sqlite file.
 			useDict (bool, Fale): SELECT-s return a list of dictionaries when set to True.
+			profile (str): The name of a pragma profile to apply on connecting. Check the var Profiles for the available profiles.
+			pragmas (dict / list): Pragmas to apply on connecting, after the profile.
+			**ConnectArgs: Passed to sqlite3.connect. Ex: check_same_thread.
 
 		Note:
 			The calss handles a single DB and allows only a single cursor over a single connection.
@@ -32,13 +58,17 @@ class SQLiteDB:
 		self._inited = False # Used to break getattr chains, that occur on connection opening errors.
 
 		self.path = filePath
-		self._conn = sqlite3.connect(self.path)
+		self._Options = dict(ConnectArgs, useDict=useDict, profile=profile, pragmas=pragmas)
+		self._conn = sqlite3.connect(self.path, **ConnectArgs)
 
 		if useDict:
 			self._conn.row_factory = dictFactory
 
 		self._cur = self._conn.cursor()
 
+		for name, value in getPragmas(profile, pragmas):
+			self._cur.execute('PRAGMA %s=%s;' % (name, value))
+
 		self._inited = True
 
 	def __del__(self):
@@ -64,7 +94,14 @@ class SQLiteDB:
 	def reopen(self):
 		r"""Reopens a closed DB.
 		"""
-		self.__init__(self.path)
+		self.__init__(self.path, **self._Options)
+
+	def getDataVersion(self):
+		r"""Returns the data version of the DB, which changes whenever other connections commit to the DB.
+		"""
+		Row = self._conn.execute('PRAGMA data_version;').fetchone()
+
+		return Row['data_version'] if hasattr(Row, 'keys') else Row[0]
 
 	def __getattr__(self, attr):
 		r"""
@@ -73,7 +110,7 @@ class SQLiteDB:
 		return getattr(self._cur, attr) if hasattr(self._cur, attr) else getattr(self._conn, attr)
 
 class SQLiteSimpleTable(SQLiteDB):
-	def __init__(self, filePath=':memory:', tableName='unnamed', key=None):
+	def __init__(self, filePath=':memory:', tableName='unnamed', key=None, profile=None, pragmas=None, **ConnectArgs):
 		r"""
 		An extension to the class, SQLiteDB that simplifies the access of tables with a primary key.
 
@@ -81,7 +118,7 @@ class SQLiteSimpleTable(SQLiteDB):
 
 		#Note: When no key is specified the key is got from the table info.
 		"""
-		SQLiteDB.__init__(self, filePath, True)
+		SQLiteDB.__init__(self, filePath, True, profile, pragmas, **ConnectArgs)
 		self.tableName = tableName
 
 		self.execute("PRAGMA table_info(`%s`);" % tableName)
@@ -111,7 +148,10 @@ class SQLiteSimpleTable(SQLiteDB):
 			'del': "DELETE FROM `%s` WHERE `%s`=?;" % (tableName, key),
 			'update': "UPDATE OR IGNORE %s SET %%s WHERE `%s`=:%s;" % (tableName, key, key),
 			'insert': "INSERT OR IGNORE INTO %s (%%s) VALUES (%%s);" % tableName,
+			'upsert': "INSERT INTO %s (%%s) VALUES (%%s) ON CONFLICT(`%s`) DO %%s;" % (tableName, key),
 		}
+		self._SetStatements = {}
+		self._batchDepth = 0
 
 	def get(self, key):
 		self.execute(self._Statements['get'], [key])
@@ -137,26 +177,91 @@ class SQLiteSimpleTable(SQLiteDB):
 
 	def set(self, Values, dontInsert=False):
 		# #From: http://stackoverflow.com/questions/14108162/python-sqlite3-insert-into-table-valuedictionary-goes-here
-		Keys = [key for key in Values.keys() if key != self._key]
-		updateStr = ','.join(['`%s`=:%s' % (key, key) for key in Keys])
+		for statement in self._getSetStatements(tuple(sorted(Values.keys())), dontInsert):
+			self.execute(statement, Values)
+
+		self._commit()
 
-		Keys = Values.keys()
-		columns = '`%s`' % '`,`'.join(Keys)
-		placeholders = ':'+',:'.join(Keys)
+	def setMany(self, Rows, dontInsert=False):
+		r"""Sets the given rows (dicts) with a single commit.
 
-		self.execute(self._Statements['update'] % updateStr, Values)
+		#Note: Consecutive rows with the same columns are written together, with a single prepared statement.
+		"""
+		Keys = None
+		Group = []
+
+		for Row in Rows:
+			RowKeys = tuple(sorted(Row.keys()))
+
+			if RowKeys != Keys:
+				self._setGroup(Keys, Group, dontInsert)
+				Keys = RowKeys
+				Group = []
+
+			Group.append(Row)
+
+		self._setGroup(Keys, Group, dontInsert)
+
+		self._commit()
 
-		if not dontInsert:
-			self.execute(self._Statements['insert'] % (columns, placeholders), Values)
+	@contextmanager
+	def batch(self):
+		r"""Defers the commits of the calls within the block, till the block exits.
+		"""
+		self._batchDepth += 1
+
+		try:
+			yield self
+
+		finally:
+			self._batchDepth -= 1
+			self._commit()
 
-		self.commit()
+	def _setGroup(self, Keys, Group, dontInsert):
+		if Group:
+			for statement in self._getSetStatements(Keys, dontInsert):
+				self.executemany(statement, Group)
+
+	def _commit(self):
+		if not self._batchDepth:
+			self.commit()
+
+	def _getSetStatements(self, Keys, dontInsert):
+		r"""Returns the statements to set the rows with the given columns. The statements are cached.
+		"""
+		cacheKey = (Keys, dontInsert)
+		Statements = self._SetStatements.get(cacheKey)
+
+		if Statements:
+			return Statements
+
+		key = self._key
+		Columns = [k for k in Keys if k != key]
+		updateStr = ','.join(['`%s`=:%s' % (k, k) for k in Columns])
+		insertArgs = ('`%s`' % '`,`'.join(Keys), ':' + ',:'.join(Keys))
+
+		if dontInsert:
+			Statements = [self._Statements['update'] % updateStr] if Columns else []
+
+		elif supportsUpsert and key in Keys:
+			Statements = [self._Statements['upsert'] % (insertArgs + (('UPDATE SET %s' % ','.join(['`%s`=excluded.`%s`' % (k, k) for k in Columns])) if Columns else 'NOTHING',))]
+
+		else:
+			Statements = ([self._Statements['update'] % updateStr] if Columns else []) + [self._Statements['insert'] % insertArgs]
+
+		self._SetStatements[cacheKey] = Statements
+
+		return Statements
 
 	def delete(self, key):
 		self.execute(self._Statements['del'], [key])
-		self.commit()
+		self._commit()
 
 	def reopen(self):
-		self.__init__(self.path, self.tableName, self._key)
+		Options = dict(self._Options)
+		del Options['useDict']
+
+		self.__init__(self.path, self.tableName, self._key, **Options)
 
 def importTables(toDBPath, fromDBPath, TableNames):
 	TargetDB = SQLiteDB(toDBPath)
@@ -170,20 +275,56 @@ def importTables(toDBPath, fromDBPath, TableNames):
 	TargetDB.commit()
 	TargetDB.close()
 
-def importTablesFromFile(toDBPath, fromFilePath, tableName=None, delimiter='\t', lineterminator='\n'):
+def importTablesFromFile(toDBPath, fromFilePath, tableName=None, delimiter='\t', lineterminator='\n', batchSize=10000, progress=None, vacuum=True, createFromHeader=False, profile=None):
+	r"""Imports the rows of the given delimited file into the given table. Returns the number of the imported rows.
+
+	Args:
+		batchSize (int): The number of rows to read and insert at a time. The whole import is done within a single transaction.
+		progress (callable): When given, it's called with the count of the imported rows, after every batch.
+		vacuum (bool): Vacuums the DB after the import.
+		createFromHeader (bool): When set to True, the first row is used as the column names, to create the table when it doesn't exist.
+		profile (str): The sqlitex profile to open the DB with. Ex: bulk-load.
+
+	#Note: The file is streamed, so to import files larger than the available memory.
+	"""
 	import csv
+	from itertools import islice
 
 	if not tableName:
 		from os.path import splitext, basename
 		tableName = basename(splitext(fromFilePath)[0]) # Use the file name as the table name.
 
-	Rows = [Row for Row in csv.reader(open(fromFilePath, 'rb+'), delimiter=delimiter, lineterminator=lineterminator)]
+	count = 0
 
-	if not Rows:
-		return
+	with open(fromFilePath, 'rb') as file:
+		Reader = csv.reader(file, delimiter=delimiter, lineterminator=lineterminator)
+		Header = next(Reader, None) if createFromHeader else None
+		Batch = list(islice(Reader, batchSize))
+
+		if not (Batch or Header):
+			return count
+
+		TargetDB = SQLiteDB(toDBPath, profile=profile)
+
+		if Header:
+			TargetDB.execute('CREATE TABLE IF NOT EXISTS {0} ({1});'.format(tableName, ','.join('`%s` TEXT' % column for column in Header)))
+
+		statement = 'INSERT OR REPLACE INTO {0} VALUES({1});'.format(tableName, ','.join(['?'] * len(Header or Batch[0])))
+
+		while Batch:
+			TargetDB.executemany(statement, Batch)
+			count += len(Batch)
+
+			if progress:
+				progress(count)
+
+			Batch = list(islice(Reader, batchSize))
 
-	TargetDB = SQLiteDB(toDBPath)
-	TargetDB.executemany('INSERT OR REPLACE INTO {0} VALUES({1});'.format(tableName, ','.join(['?'] * len(Rows[0]))), Rows)
-	TargetDB.execute("VACUUM;")
 	TargetDB.commit()
+
+	if vacuum:
+		TargetDB.execute("VACUUM;")
+
 	TargetDB.close()
+
+	return count
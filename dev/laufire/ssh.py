@@ -6,16 +6,21 @@ r"""A helper for SSH operations.
 import json
 import errno
 
-from os import listdir
-from os.path import basename, split as pathSplit
+from contextlib import contextmanager
+from os import listdir, stat
+from os.path import basename, dirname, getsize, split as pathSplit
+from pipes import quote
+from threading import Condition, Thread
 
-import paramiko
 from laufire.extensions import Lazy
-from laufire.filesys import getPathType, joinPaths, pair
-from laufire.flow import forgive, retry
+from laufire.filesys import collectPaths, getPathType, joinPaths, packTree, pair
+from laufire.flow import forgive, monotonic, retry
 from laufire.logger import debug
 from laufire.shell import assertShell
 
+# Data
+maxCommandLength = 65536 # The maximum length of the batched commands.
+
 # Helpers
 def _upload(SFTP, localPath, remotePath):
 
@@ -73,42 +78,335 @@ def mkdirs(SFTP, remotePath):
 def getTgtName(tgtName, srcPath):
 	return tgtName if tgtName else basename(srcPath)
 
+def getPoolKey(SSHConfig):
+	return SSHConfig['host'], SSHConfig.get('username')
+
+def closeClients(Clients):
+	for Client in Clients:
+		forgive(Client.close)
+
+def getBatchedCommands(command, Args):
+	r"""Yields the given command with the given args (quoted), batched into commands of a limited length.
+	"""
+	Batch = []
+	length = len(command)
+
+	for arg in Args:
+		quoted = quote(arg)
+
+		if Batch and length + len(quoted) >= maxCommandLength:
+			yield '%s %s' % (command, ' '.join(Batch))
+
+			Batch = []
+			length = len(command)
+
+		Batch.append(quoted)
+		length += len(quoted) + 1
+
+	if Batch:
+		yield '%s %s' % (command, ' '.join(Batch))
+
+def readRemote(File, name, Buffer, onOutput):
+	for line in iter(File.readline, ''):
+		Buffer.append(line)
+
+		if onOutput:
+			onOutput(name, line)
+
+def getTransferErrors():
+	import paramiko
+
+	return (EnvironmentError, paramiko.SSHException, paramiko.SFTPError)
+
+def collectUploads(localPath, remotePath):
+	r"""Returns the remote dirs to create and the (local, remote) file pairs to upload, for the given local dir.
+	"""
+	Dirs = [remotePath]
+	Files = []
+
+	for path, pathType in collectPaths(localPath):
+		if pathType == 1:
+			Files.append(pair(localPath, remotePath, path))
+
+		else:
+			Dirs.append(joinPaths(remotePath, path))
+
+	return Dirs, Files
+
+def makeRemoteDirs(Client, Dirs):
+	r"""Creates the given remote dirs, with as few remote calls as possible.
+	"""
+	for command in getBatchedCommands('mkdir -p', Dirs):
+		assertShell(Client.execute(command))
+
+def transferFiles(Client, Pairs, workers):
+	r"""Uploads the given (local, remote) file pairs over the given number of SFTP channels at once. Returns the pairs that failed.
+
+	#Note: paramiko pipelines the writes of put. Hence, each channel keeps the link busy, while the channels together hide the per-file round trips.
+	"""
+	from Queue import Queue, Empty
+
+	Pending = Queue()
+	Failed = []
+
+	for Pair in sorted(Pairs, key=lambda Pair: getsize(Pair[0]), reverse=True): # The larger files are sent first, to balance the channels.
+		Pending.put(Pair)
+
+	def worker():
+		SFTP = Client.open_sftp()
+
+		try:
+			while True:
+				try:
+					Pair = Pending.get_nowait()
+
+				except Empty:
+					return
+
+				debug('uploading %s to %s' % Pair)
+
+				try:
+					SFTP.put(*Pair)
+
+				except Exception as e: #pylint: disable=W0703
+					debug(e)
+					Failed.append(Pair)
+
+		finally:
+			SFTP.close()
+
+	Workers = [Thread(target=worker) for dummy in range(min(workers, len(Pairs)))]
+
+	for thread in Workers:
+		thread.daemon = True
+		thread.start()
+
+	for thread in Workers:
+		thread.join()
+
+	while not Pending.empty(): # The pairs left by the workers that couldn't open their channels.
+		Failed.append(Pending.get_nowait())
+
+	return Failed
+
+def sendFiles(Client, Pairs, workers, TransferErrors=None, keepTimes=False):
+	r"""Uploads the given (local, remote) file pairs over many SFTP channels at once, while retrying the failed files individually.
+
+	Args:
+		keepTimes (bool): Sets the modification times of the remote files, to those of the local files.
+	"""
+	Failed = transferFiles(Client, Pairs, workers)
+
+	if not (Failed or keepTimes):
+		return
+
+	SFTP = Client.open_sftp()
+
+	if Failed:
+		TransferErrors = TransferErrors or getTransferErrors()
+
+	try:
+		for Pair in Failed:
+			retry(lambda: SFTP.put(*Pair) or 1, Exceptions=TransferErrors) #pylint: disable=cell-var-from-loop
+
+		if keepTimes:
+			for localPath, remotePath in Pairs:
+				Stat = stat(localPath)
+				SFTP.utime(remotePath, (Stat.st_atime, Stat.st_mtime))
+
+	finally:
+		SFTP.close()
+
+def getRemoteManifest(Client, remotePath, useMD5=False):
+	r"""Returns the dirs and the files under the given remote dir, with a single remote call. The files are returned as {relative path: (size, mtime)}, or as {relative path: digest} when useMD5 is set.
+
+	#Note: GNU find is expected at the remote. Paths with new-lines aren't supported.
+	"""
+	prefixLength = len(remotePath) + 1
+	quotedPath = quote(remotePath)
+	Dirs = set()
+	Files = {}
+
+	Result = Client.execute('find %s -mindepth 1 -type d' % quotedPath)
+	Dirs.update(line[prefixLength:] for line in Result['out'].splitlines() if line) # #Note: A missing dir results in an empty manifest.
+
+	if useMD5:
+		Result = Client.execute('find %s -type f -exec md5sum {} +' % quotedPath)
+
+		for line in Result['out'].splitlines():
+			if line:
+				digest, path = line.split('  ', 1)
+				Files[path[prefixLength:]] = digest
+
+	else:
+		Result = Client.execute('find %s -type f -printf \'%%s\\t%%T@\\t%%p\\n\'' % quotedPath)
+
+		for line in Result['out'].splitlines():
+			if line:
+				size, mtime, path = line.split('\t', 2)
+				Files[path[prefixLength:]] = (int(size), int(float(mtime)))
+
+	return Dirs, Files
+
+def isCurrent(localPath, Remote, useMD5):
+	r"""Checks whether the given remote entry (from getRemoteManifest) matches the given local file.
+	"""
+	if Remote is None:
+		return False
+
+	if useMD5:
+		from laufire.utils import getMD5
+
+		return getMD5(localPath) == Remote
+
+	Stat = stat(localPath)
+
+	return (Stat.st_size, int(Stat.st_mtime)) == Remote
+
+def uploadTree(Client, localPath, remotePath, workers=4, TransferErrors=None):
+	r"""Uploads the given local dir, by creating the remote dirs first, in a single pass, and by then sending the files over many SFTP channels at once. The failed files are retried individually.
+	"""
+	Dirs, Files = collectUploads(localPath, remotePath)
+
+	makeRemoteDirs(Client, Dirs)
+	sendFiles(Client, Files, workers, TransferErrors)
+
+	return remotePath
+
+def uploadDelta(Client, localPath, remotePath, workers=1, useMD5=False, TransferErrors=None):
+	r"""Uploads only the files of the given local dir, that differ from those of the remote dir, by their sizes and modification times (or MD5 digests). The remote modification times are synced with the local ones, so that the unchanged files would match in later uploads.
+
+	#Note: The remote paths missing locally aren't removed.
+	"""
+	Dirs, Files = collectUploads(localPath, remotePath)
+	RemoteDirs, RemoteFiles = getRemoteManifest(Client, remotePath, useMD5)
+	prefixLength = len(remotePath) + 1
+
+	MissingDirs = [path for path in Dirs[1:] if path[prefixLength:] not in RemoteDirs] # #Note: The first dir is the remote dir itself.
+	Changed = [Pair for Pair in Files if not isCurrent(Pair[0], RemoteFiles.get(Pair[1][prefixLength:]), useMD5)]
+
+	debug('uploading %d of %d files' % (len(Changed), len(Files)))
+
+	if MissingDirs or Changed:
+		makeRemoteDirs(Client, [remotePath] + MissingDirs)
+
+	if Changed:
+		sendFiles(Client, Changed, workers, TransferErrors, True)
+
+	return remotePath
+
+def getExtractCommand(tgtPath, compressLevel=6):
+	r"""Returns a shell command that extracts the tar stream, read from stdin, into the given dir.
+	"""
+	tgtPath = quote(tgtPath)
+
+	return 'mkdir -p %s && tar -x%sf - -C %s' % (tgtPath, 'z' if compressLevel else '', tgtPath)
+
+def uploadArchive(Client, localPath, remotePath, compressLevel=6):
+	r"""Uploads the given local dir as a single tar stream, extracted by a remote tar, as it arrives. Returns the count of the bytes transferred.
+
+	#Note: Trees of many small files are uploaded much faster this way, than with per-file SFTP transfers.
+	"""
+	command = getExtractCommand(remotePath, compressLevel)
+	debug(command)
+	stdin, stdout, stderr = Client.exec_command(command)
+	Err = []
+
+	reader = Thread(target=readRemote, args=(stderr, 'err', Err, None)) # #Note: stderr is drained while the stream is being written, so that the remote tar won't block on it.
+	reader.daemon = True
+	reader.start()
+
+	size = packTree(localPath, stdin, compressLevel=compressLevel)
+	stdin.channel.shutdown_write()
+	code = stdout.channel.recv_exit_status()
+	reader.join()
+
+	if code:
+		raise Exception('Failed extracting the archive to %s: %s' % (remotePath, ''.join(Err)))
+
+	debug('transferred %d bytes' % size)
+
+	return size
+
 # Classes
-class SSHClient(paramiko.SSHClient):
+class SSHClient:
 	r"""An abstraction layer over the SSH client.
+
+	#Note: The paramiko client is wrapped instead of being inherited, so that paramiko is imported only when a client is created.
 	"""
 	def __init__(self, SSHConfig):
-		paramiko.SSHClient.__init__(self)
+		import paramiko
+
+		self._Client = Client = paramiko.SSHClient()
+
+		Client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+		Client.load_system_host_keys()
+		Client.connect(SSHConfig['host'], username=SSHConfig['username'], password=SSHConfig['password'])
+
+		keepalive = SSHConfig.get('keepalive')
+
+		if keepalive:
+			Client.get_transport().set_keepalive(keepalive)
 
-		self.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-		self.load_system_host_keys()
-		self.connect(SSHConfig['host'], username=SSHConfig['username'], password=SSHConfig['password'])
-		self._SFTP = self.open_sftp()
+		self._SFTP = Client.open_sftp()
 
 	def __del__(self):
+		if '_SFTP' in self.__dict__:
+			self._SFTP.close()
+
+	def isActive(self):
+		r"""Checks whether the underlying connection is still usable.
+		"""
+		Transport = self._Client.get_transport()
+
+		return bool(Transport and Transport.is_active())
+
+	def close(self):
 		self._SFTP.close()
+		self._Client.close()
 
 	def __getattr__(self, attr):
 		r"""
-		Allows to access the methods of the underlying SFTP connection.
+		Allows to access the methods of the underlying SSH client and then those of the SFTP connection.
 		"""
-		return getattr(self._SFTP, attr)
+		Attrs = self.__dict__
+
+		if '_Client' not in Attrs: # The client isn't initialized yet.
+			raise AttributeError(attr)
+
+		return getattr(Attrs['_Client'], attr) if hasattr(Attrs['_Client'], attr) else getattr(Attrs['_SFTP'], attr)
 
 	def download(self, remotePath, localPath=''):
 		debug('downloading %s to %s' % (remotePath, localPath))
-		SFTP = self.open_sftp()
 		localPath = getTgtName(localPath, remotePath)
-		SFTP.get(remotePath, localPath)
-		SFTP.close()
+		self._SFTP.get(remotePath, localPath)
 
 		return localPath
 
-	def upload(self, localPath, remotePath):
+	def upload(self, localPath, remotePath, workers=None, delta=False, useMD5=False, archive=False, compressLevel=6):
+		r"""Uploads the given local path.
+
+		Args:
+			workers (int): Uploads the dirs over the given number of SFTP channels at once.
+			delta (bool): Uploads only the files of the dirs, that differ from those of the remote, by their sizes and modification times.
+			useMD5 (bool): Compares the files by their MD5 digests, with delta uploads.
+			archive (bool): Uploads the dirs as a single tar stream, extracted by the remote. Needs tar on the remote.
+			compressLevel (int): The gzip compression level of archive uploads. 0 turns-off the compression.
+		"""
 		remotePath = getTgtName(remotePath, localPath)
+		isDir = getPathType(localPath) > 1
 
-		SFTP = self.open_sftp()
-		_upload(SFTP, localPath, remotePath)
-		SFTP.close()
+		if archive and isDir:
+			uploadArchive(self, localPath, remotePath, compressLevel)
+
+		elif delta and isDir:
+			uploadDelta(self, localPath, remotePath, workers or 1, useMD5)
+
+		elif workers and workers > 1 and isDir:
+			uploadTree(self, localPath, remotePath, workers)
+
+		else:
+			_upload(self._SFTP, localPath, remotePath)
 
 		return remotePath
 
@@ -117,23 +415,218 @@ class SSHClient(paramiko.SSHClient):
 
 		return True if not err else (isinstance(err, IOError) and err.errno == errno.ENOENT)
 
-	def execute(self, command):
+	def execute(self, command, onOutput=None):
+		r"""Executes the given command and returns a dictionary with the return-code, stdout and stderr.
+
+		Args:
+			onOutput (callable): Called with (streamName, line), as the output arrives. The calls could come from different threads.
+
+		#Note: stderr is drained by a thread, while stdout is being read, so that the remote process won't block on either of them.
+		"""
 		debug(command)
 		dummy, stdout, stderr = self.exec_command(command)
+		Out = []
+		Err = []
+
+		reader = Thread(target=readRemote, args=(stderr, 'err', Err, onOutput))
+		reader.daemon = True
+		reader.start()
+
+		readRemote(stdout, 'out', Out, onOutput)
+		reader.join()
 
 		return {
 
 			'code': stdout.channel.recv_exit_status(),
-			'out': stdout.read(),
-			'err': stderr.read(),
+			'out': ''.join(Out),
+			'err': ''.join(Err),
 		}
 
+class SSHPool:
+	r"""A thread-safe pool of SSH clients, keyed by (host, username). The clients (and thus their SFTP channels) are reused across the checkouts.
+
+	Args:
+		maxSize (int): The maximum number of clients per key. Checkouts beyond it wait for a client to be returned.
+		maxIdle (float): The seconds after which, the idle clients are closed.
+		keepalive (int): The interval of the keepalive packets, in seconds. It's used when the SSHConfig doesn't specify one.
+		clientFactory (callable): Creates the clients from the SSHConfigs. Defaults to SSHClient.
+	"""
+	def __init__(self, maxSize=4, maxIdle=300, keepalive=30, clientFactory=None):
+		self.maxSize = maxSize
+		self.maxIdle = maxIdle
+		self.keepalive = keepalive
+		self._clientFactory = clientFactory or SSHClient
+		self._Idle = {} # {key: [(client, released time)]}
+		self._Counts = {} # {key: the count of the open clients}
+		self._condition = Condition()
+
+	@contextmanager
+	def checkout(self, SSHConfig):
+		r"""Lends a client for the given SSHConfig, for the duration of the context.
+		"""
+		Client = self.acquire(SSHConfig)
+
+		try:
+			yield Client
+
+		finally:
+			self.release(Client, SSHConfig)
+
+	def acquire(self, SSHConfig):
+		r"""Returns a healthy client for the given SSHConfig, reusing an idle one when possible. The client should be returned with release.
+		"""
+		key = getPoolKey(SSHConfig)
+		Counts = self._Counts
+		Discarded = []
+
+		try:
+			with self._condition:
+				while True:
+					self._evict(Discarded)
+					Idle = self._Idle.get(key)
+
+					while Idle:
+						Client = Idle.pop()[0] # The most recently used client.
+
+						if Client.isActive():
+							return Client
+
+						self._discard(key, Client, Discarded)
+
+					if Counts.get(key, 0) < self.maxSize:
+						Counts[key] = Counts.get(key, 0) + 1
+						break
+
+					self._condition.wait()
+
+		finally:
+			closeClients(Discarded)
+
+		try: # #Note: Clients are created outside the lock, as connecting is slow.
+			if self.keepalive and 'keepalive' not in SSHConfig:
+				SSHConfig = dict(SSHConfig, keepalive=self.keepalive)
+
+			return self._clientFactory(SSHConfig)
+
+		except:
+			with self._condition:
+				Counts[key] -= 1
+				self._condition.notify()
+
+			raise
+
+	def release(self, Client, SSHConfig):
+		with self._condition:
+			self._Idle.setdefault(getPoolKey(SSHConfig), []).append((Client, monotonic()))
+			self._condition.notify()
+
+	def close(self):
+		r"""Closes all the idle clients.
+		"""
+		Discarded = []
+
+		with self._condition:
+			for key, Idle in self._Idle.items():
+				for Client, dummy in Idle:
+					self._discard(key, Client, Discarded)
+
+			self._Idle.clear()
+
+		closeClients(Discarded)
+
+	def _evict(self, Discarded):
+		expiry = monotonic() - self.maxIdle
+
+		for key, Idle in self._Idle.items():
+			while Idle and Idle[0][1] < expiry: # The least recently used clients are in the front.
+				self._discard(key, Idle.pop(0)[0], Discarded)
+
+	def _discard(self, key, Client, Discarded):
+		r"""Frees the slot of the given client. The client is collected into Discarded, to be closed after releasing the lock, as closing could block on the network.
+		"""
+		self._Counts[key] -= 1
+		Discarded.append(Client)
+		self._condition.notify()
+
+class PooledClient:
+	r"""Proxies the calls to the clients, checked out from the given pool.
+	"""
+	def __init__(self, Pool, SSHConfig):
+		self._Pool = Pool
+		self._SSHConfig = SSHConfig
+
+	def __getattr__(self, attr):
+		def call(*Args, **KWArgs):
+			with self._Pool.checkout(self._SSHConfig) as Client:
+				return getattr(Client, attr)(*Args, **KWArgs)
+
+		return call
+
+def executeMany(SSHConfigs, commandTpl, workers=8, onOutput=None, clientFactory=None, Pool=None):
+	r"""Executes the given command template (formatted with each SSHConfig) on the given hosts, concurrently. Returns the results (dictionaries with the keys host, code, out, err, duration and error), in the order of the SSHConfigs.
+
+	Args:
+		workers (int): The maximum number of hosts to execute on, at a time.
+		onOutput (callable): Called with (host, streamName, line), as the output arrives.
+		clientFactory (callable): Creates the clients from the SSHConfigs. Defaults to SSHClient.
+		Pool (SSHPool): A pool to check the clients out from, instead of connecting afresh.
+
+	#Note: The connection errors are reported through the key, error (with a None code), instead of being raised, so that a host won't fail the others.
+	"""
+	clientFactory = clientFactory or SSHClient
+
+	def execute(Client, SSHConfig):
+		host = SSHConfig['host']
+		return Client.execute(commandTpl.format(**SSHConfig), onOutput=(lambda name, line: onOutput(host, name, line)) if onOutput else None)
+
+	def worker(SSHConfig):
+		start = monotonic()
+		Result = {'host': SSHConfig['host'], 'error': None}
+
+		try:
+			if Pool:
+				with Pool.checkout(SSHConfig) as Client:
+					Result.update(execute(Client, SSHConfig))
+
+			else:
+				Client = clientFactory(SSHConfig)
+
+				try:
+					Result.update(execute(Client, SSHConfig))
+
+				finally:
+					forgive(Client.close)
+
+		except Exception as e: #pylint: disable=W0703
+			debug(e)
+			Result.update({'code': None, 'out': '', 'err': str(e), 'error': e})
+
+		Result['duration'] = monotonic() - start
+
+		return Result
+
+	if workers > 1 and len(SSHConfigs) > 1:
+		from multiprocessing.pool import ThreadPool
+
+		ThreadPoolObj = ThreadPool(min(workers, len(SSHConfigs)))
+		Results = list(ThreadPoolObj.imap(worker, SSHConfigs))
+		ThreadPoolObj.close()
+		ThreadPoolObj.join()
+
+	else:
+		Results = [worker(SSHConfig) for SSHConfig in SSHConfigs]
+
+	return Results
+
 class SSHBridge:
 	r"""Bridges with the SSH gateway of the remote host.
+
+	Args:
+		Pool (SSHPool): A pool to share the clients through. When not given, the bridge holds a client of its own.
 	"""
-	def __init__(self, Config):
+	def __init__(self, Config, Pool=None):
 		self.Config = Config
-		self.Client = Lazy(SSHClient, Config['SSH']) # #Note: SSHBridge is initialized as lazy class, as parmiko cannot connect to the server when modules are being loaded, due to some internals of threading.
+		self.Client = PooledClient(Pool, Config['SSH']) if Pool else Lazy(SSHClient, Config['SSH']) # #Note: SSHBridge is initialized as lazy class, as parmiko cannot connect to the server when modules are being loaded, due to some internals of threading.
 
 	def __getattr__(self, attr):
 		r"""
@@ -150,8 +643,8 @@ class SSHBridge:
 		out = assertShell(self.iexecute('{Python[binary]} {Paths[private]}/%s' % ecCommand))
 		return json.loads(out) if out else None
 
-	def upload(self, srcPath, tgtPath=''):
-		r"""Uploads through the gateway are done to the temp dir by default.
+	def upload(self, srcPath, tgtPath='', **KWArgs):
+		r"""Uploads through the gateway are done to the temp dir by default. Check SSHClient.upload for the KWArgs.
 		"""
 		if not tgtPath:
 			tgtPath = joinPaths(self.Config['Gateway']['Paths']['temp'], getTgtName(None, srcPath))
@@ -159,4 +652,4 @@ class SSHBridge:
 		else:
 			tgtPath = tgtPath.format(**self.Config['Gateway'])
 
-		return self.Client.upload(srcPath, tgtPath)
+		return self.Client.upload(srcPath, tgtPath, **KWArgs)
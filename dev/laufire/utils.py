@@ -1,5 +1,36 @@
 r"""Utilities
 """
+# Data
+md5ChunkSize = 1024 * 1024
+minPooledFiles = 16 # Fewer files are hashed in-process, as starting a pool costs more.
+manifestTableName = 'md5manifest'
+
+# Helpers
+def getManifestTable(manifestPath):
+	from laufire.sqlitex import SQLiteDB, SQLiteSimpleTable
+
+	DB = SQLiteDB(manifestPath)
+	DB.execute("CREATE TABLE IF NOT EXISTS %s (`path` TEXT PRIMARY KEY, `inode` INTEGER, `size` INTEGER, `mtime` REAL, `digest` TEXT)" % manifestTableName)
+	DB.close()
+
+	return SQLiteSimpleTable(manifestPath, manifestTableName, 'path')
+
+def hashFiles(Paths, processes=None):
+	r"""Returns the MD5 digests of the given files, in order. The files are hashed by a process pool, when there are many.
+	"""
+	if processes == 1 or len(Paths) < minPooledFiles:
+		return [getMD5(path) for path in Paths]
+
+	from multiprocessing import Pool
+
+	Workers = Pool(processes)
+	Digests = Workers.map(getMD5, Paths, max(1, len(Paths) // ((processes or 4) * 4)))
+	Workers.close()
+	Workers.join()
+
+	return Digests
+
+# Exports
 def getMD5ForIterable(Iterable):
 	import hashlib
 
@@ -15,7 +46,56 @@ def getMD5(filePath): # #From: http://stackoverflow.com/questions/3431825/genera
 	"""
 	from laufire.filesys import iterateContent
 
-	return getMD5ForIterable(iterateContent(filePath))
+	return getMD5ForIterable(iterateContent(filePath, md5ChunkSize))
+
+def getTreeMD5(base='.', pattern='**', manifestPath=None, processes=None):
+	r"""Returns a dict of the MD5 digests of the files under the given base, keyed by their paths relative to the base.
+
+	Args:
+		base (str): The dir to scan.
+		pattern (str): A pattern as accepted by filesys.collectPaths.
+		manifestPath (str): The path to a SQLite DB, to persist the digests between the calls. The digests of the files with unchanged inodes, sizes and mtimes are reused from it.
+		processes (int): The number of processes to hash the changed files with. Defaults to the number of CPUs.
+	"""
+	from os import stat
+	from os.path import abspath
+	from laufire.filesys import collectPaths, filterPaths, joinPaths, stdPath
+
+	absBase = stdPath(abspath(base))
+	Paths = [path for path, pathType in collectPaths(base, pattern) if pathType == 1]
+	Manifest = getManifestTable(manifestPath) if manifestPath else None
+	Entries = Manifest.getAll() if Manifest else {}
+	Digests = {}
+	Rows = []
+
+	for path in Paths:
+		absPath = joinPaths(absBase, path)
+		Stat = stat(absPath)
+		Row = {'path': absPath, 'inode': Stat.st_ino, 'size': Stat.st_size, 'mtime': Stat.st_mtime, 'digest': None}
+		Entry = Entries.get(absPath)
+
+		if Entry and all(Entry[k] == Row[k] for k in ('inode', 'size', 'mtime')):
+			Digests[path] = Entry['digest']
+
+		else:
+			Rows.append((path, Row))
+
+	for Item, digest in zip(Rows, hashFiles([joinPaths(absBase, Item[0]) for Item in Rows], processes)):
+		Digests[Item[0]] = Item[1]['digest'] = digest
+
+	if Manifest:
+		prefixLength = len(absBase) + 1
+
+		with Manifest.batch():
+			for path in filterPaths([p[prefixLength:] for p in Entries if p.startswith('%s/' % absBase)], pattern): # Forget the removed files.
+				if path not in Digests:
+					Manifest.delete(joinPaths(absBase, path))
+
+			Manifest.setMany([Row for dummy, Row in Rows])
+
+		Manifest.close()
+
+	return Digests
 
 def getTimeString(useLocal=False):
 	r"""Returns the current time as a path friendly string.
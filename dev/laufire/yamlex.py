@@ -8,13 +8,23 @@ A wrapper around HiYaPyCo that supports:
 * Runtime variables.
 
 #Later: Allow external template sources. ie: The source data won't be in the rendered data. This passibly could be a KWArg named, env.
+#Note: HiYaPyCo (along with PyYAML and Jinja) is imported and overlaid only on first use, to keep the module cheap to import.
 #Later: Check whether the dependency on HiYaPyCo could be shed, especially to avoid depending on Jinja2, thus enabling the possibility for a simpler template syntax (might be with relative templating).
 """
-from hiyapyco import HiYaPyCo, dump, odyldo
-from jinja2 import Template
+from collections import OrderedDict
+from threading import Lock
 
 from .extensions import merge
 
+# Data
+templateCacheSize = 1024 # The maximum number of compiled templates to cache.
+
+# State
+TemplateCache = OrderedDict() # Compiled templates, keyed by (environment, source), in the order of their use.
+TemplateCacheStats = {'hits': 0, 'misses': 0}
+templateCacheLock = Lock()
+renderEnvironment = None # The environment of YamlEx.render. It's created on first use.
+
 # #Later: Make YamlEx to inherit 'dict', so that it could support all the functionalities of a dict.
 class YamlEx:
 	r"""The wrapper class.
@@ -26,6 +36,8 @@ class YamlEx:
 		if FilePaths and FilePaths[0] is None: # None is supplied for the file path.
 			FilePaths = None
 
+		HiYaPyCo = getHiYaPyCo().HiYaPyCo
+
 		self.HiYaPyCo = H = HiYaPyCo(*FilePaths, **KWArgs) if FilePaths else HiYaPyCo('---\n{}', **KWArgs) # return an empty object when no file is mentioned.
 		self.Data = H._data #pylint: disable=W0212
 
@@ -68,6 +80,8 @@ class YamlEx:
 		Args:
 			filePath (str): A path to a valid YAML file.
 		"""
+		from hiyapyco import odyldo
+
 		self.setData(merge(self.Data, odyldo.safe_load(open(filePath, 'r'))))
 
 		if interpolate:
@@ -78,19 +92,93 @@ class YamlEx:
 	def dump(self, defaultFlowStyle=True):
 		r"""Returns the YAML dump.
 		"""
+		from hiyapyco import dump
+
 		return dump(self.Data, defaultFlowStyle)
 
 	def render(self, tmplStr):
 		r"""Renders the given template.
 		"""
-		return Template(tmplStr).render(self.Data)
+		global renderEnvironment
+
+		if not needsRendering(tmplStr):
+			return tmplStr
+
+		if not renderEnvironment:
+			from jinja2 import Environment
+			renderEnvironment = Environment()
+
+		return getTemplate(tmplStr, renderEnvironment).render(self.Data)
 
 	# Allow access to the underlying dictionary attrs, this also will allow access to the keys of self.Data.
 	def __getattr__(self, attr):
 		return getattr(self.Data, attr)
 
+# Helpers
+def hasMarkers(value):
+	r"""Checks whether the given value is a string with template markers.
+	"""
+	return isinstance(value, basestring) and ('{{' in value or '{%' in value or '{#' in value)
+
+def needsRendering(value):
+	r"""Checks whether rendering could change the given value. Strings without markers are rendered as they are, except for their line breaks, which Jinja normalizes.
+	"""
+	return hasMarkers(value) or (isinstance(value, basestring) and '\n'.join(value.splitlines()) != value)
+
+def getTemplate(source, environment=None):
+	r"""Returns the compiled template of the given source, from a bounded LRU cache.
+	"""
+	environment = environment or getEnvironment()
+	key = (environment, source)
+
+	with templateCacheLock:
+		Template = TemplateCache.pop(key, None)
+
+		if Template:
+			TemplateCacheStats['hits'] += 1
+
+		else:
+			TemplateCacheStats['misses'] += 1
+
+			if len(TemplateCache) >= templateCacheSize:
+				TemplateCache.popitem(last=False) # Evict the least recently used.
+
+		if Template:
+			TemplateCache[key] = Template # Mark the template as the most recently used.
+			return Template
+
+	from jinja2 import Environment
+
+	Template = Environment.from_string(environment, source) # #Note: Compiling is done outside the lock, as it's costly.
+
+	with templateCacheLock:
+		TemplateCache[key] = Template
+
+	return Template
+
+def clearTemplateCache():
+	with templateCacheLock:
+		TemplateCache.clear()
+		TemplateCacheStats.update(hits=0, misses=0)
+
+def getEnvironment():
+	r"""Returns the Jinja environment used for interpolation.
+	"""
+	return getHiYaPyCo().jinja2env
+
+def getHiYaPyCo():
+	r"""Returns the module, hiyapyco, after overlaying it.
+	"""
+	import hiyapyco
+
+	if not hasattr(hiyapyco.HiYaPyCo, '_interpolatestr_orig'): # Skip overlaying, if it's already done (through import collision etc).
+		overlayHiYaPyCo()
+
+	return hiyapyco
+
 def overlayHiYaPyCo():
 	import hiyapyco
+	from hiyapyco import HiYaPyCo
 	from jinja2 import Environment, Undefined
 	from jinja2.utils import missing
 	from jinja2._compat import implements_to_string
@@ -110,13 +198,25 @@ def overlayHiYaPyCo():
 
 		__iter__ = __len__ = __nonzero__ = __eq__ = __ne__ = __bool__ = __hash__ = __str__
 
-	hiyapyco.jinja2env = Environment(undefined=UntouchedUndefined)
+	class CachedEnvironment(Environment):
+		r"""Reuses the compiled templates from the template cache.
+		"""
+		def from_string(self, source, globals=None, template_class=None): #pylint: disable=W0622
+			if globals or template_class or not isinstance(source, basestring):
+				return Environment.from_string(self, source, globals, template_class)
+
+			return getTemplate(source, self)
+
+	hiyapyco.jinja2env = CachedEnvironment(undefined=UntouchedUndefined)
 
 	# Hook into HiYaPyCo._interpolatestr so that string could be interpolated recursively.
 
 	HiYaPyCo._interpolatestr_orig = HiYaPyCo._interpolatestr #pylint: disable=W0212
 
 	def _interpolatestrHook(self, s):
+		if not needsRendering(s): # Skip Jinja for plain strings.
+			return s
+
 		rendered = self._interpolatestr_orig(s) #pylint: disable=W0212
 
 		while s != rendered:
@@ -126,6 +226,3 @@ def overlayHiYaPyCo():
 		return s
 
 	HiYaPyCo._interpolatestr = _interpolatestrHook #pylint: disable=W0212
-
-if not hasattr(HiYaPyCo, '_interpolatestr_orig'): # Skip overlaying, if the module is parsed more than one time (through import collision etc).
-	overlayHiYaPyCo()
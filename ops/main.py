@@ -17,6 +17,9 @@ Paths = Config['Paths']
 testsDir = Paths['tests']
 testFilePattern = '^test_(\\w+).py$'
 TestNames = list(re.search(testFilePattern, i).group(1) for i in os.listdir(testsDir) if re.search(testFilePattern, i))
+benchmarksDir = Paths['benchmarks']
+benchmarkFilePattern = '^bench_(\\w+).py$'
+BenchmarkNames = list(re.search(benchmarkFilePattern, i).group(1) for i in os.listdir(benchmarksDir) if re.search(benchmarkFilePattern, i))
 
 # Helpers
 def call(*Args, **KWArgs):
@@ -62,4 +65,13 @@ def test(testName='*', isVerbose=False, debug=False):
 	else:
 		assert run('python -m unittest discover -s "%s" -p test_%s.py -fc%s' % (Config['Paths']['tests'], testName, 'v' if isVerbose else ''), shell=True) == 0, 'Testing failed.'
 
+@task(alias='bm')
+@arg(type=multi.one_of(BenchmarkNames), sep='\n\t')
+def benchmark(benchmarkName):
+	r"""Runs the given benchmark.
+	"""
+	from laufire.shell import run
+
+	assert run('python "%s/bench_%s.py"' % (benchmarksDir, benchmarkName), shell=True) == 0, 'Benchmarking failed.'
+
 settings(debug=Config['debug'])
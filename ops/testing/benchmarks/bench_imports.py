@@ -0,0 +1,86 @@
+r"""Benchmarks the import times of the modules of laufire, against their budgets.
+
+Each module is imported in a fresh interpreter. The import times are read from -X importtime, when the interpreter supports it, else the wall time of the import is measured. The best of the runs is compared against the budget.
+
+#Usage: python bench_imports.py <runs>
+"""
+import sys
+
+from subprocess import Popen, PIPE
+
+# Data
+Budgets = { # {module: (budget in ms, modules that shouldn't be loaded)} #Note: The budgets are kept at about 1.5 times the measured times, so that the noise of the runs won't fail them.
+	'laufire.extensions': (5, []),
+	'laufire.logger': (10, ['colorama', 'laufire.initializer']),
+	'laufire.flow': (15, ['colorama']),
+	'laufire.filesys': (25, ['colorama', 'laufire.dev']),
+	'laufire.shell': (20, ['colorama', 'laufire.dev']),
+	'laufire.parser': (5, ['yaml', 'json']),
+	'laufire.yamlex': (10, ['hiyapyco', 'jinja2', 'yaml']),
+	'laufire.sqlitex': (15, []),
+	'laufire.ecstore': (40, ['hiyapyco', 'jinja2', 'yaml']),
+	'laufire.ssh': (60, ['paramiko', 'colorama']),
+}
+
+supportsImportTime = sys.version_info >= (3, 7)
+
+probeScript = r'''
+import sys
+from time import time
+
+start = time()
+import %s
+duration = (time() - start) * 1000
+
+print('%%f %%s' %% (duration, ' '.join(m for m in sys.modules if sys.modules[m] is not None)))
+'''
+
+# Helpers
+def getImportTime(stderr, moduleName):
+	r"""Returns the cumulative import time (in ms) of the given module, from the output of -X importtime.
+	"""
+	for line in stderr.splitlines():
+		Parts = line.split('|')
+
+		if len(Parts) == 3 and Parts[2].strip() == moduleName:
+			return int(Parts[1]) / 1000.0
+
+def probe(moduleName):
+	Args = [sys.executable] + (['-X', 'importtime'] if supportsImportTime else []) + ['-c', probeScript % moduleName]
+	p = Popen(Args, stdin=PIPE, stdout=PIPE, stderr=PIPE, universal_newlines=True)
+	out, err = p.communicate()
+
+	if p.returncode:
+		raise Exception('Failed importing %s:\n%s' % (moduleName, err))
+
+	wallTime, Loaded = out.strip().split(' ', 1)
+	importTime = getImportTime(err, moduleName) if supportsImportTime else None
+
+	return (importTime or float(wallTime)), set(Loaded.split(' '))
+
+# Main
+def main():
+	runCount = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+	Failures = []
+
+	print('source: %s, runs: %s\n' % ('-X importtime' if supportsImportTime else 'wall time', runCount))
+	print('%-24s%10s%10s  %s' % ('module', 'time', 'budget', 'status'))
+
+	for moduleName in sorted(Budgets.keys()):
+		budget, Unwanted = Budgets[moduleName]
+		Results = [probe(moduleName) for _ in range(runCount)]
+		best = min(r[0] for r in Results)
+		Leaked = sorted(m for m in Unwanted if m in Results[0][1])
+
+		Problems = (['over budget'] if best > budget else []) + (['loads %s' % ', '.join(Leaked)] if Leaked else [])
+		print('%-24s%8.1fms%8dms  %s' % (moduleName, best, budget, '; '.join(Problems) or 'ok'))
+
+		if Problems:
+			Failures.append(moduleName)
+
+	if Failures:
+		print('\nRegressed: %s' % ', '.join(Failures))
+		sys.exit(1)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,57 @@
+r"""Benchmarks the pragma profiles of the module, sqlitex.
+
+#Usage: python bench_sqlitex.py <rows>
+"""
+import sys
+
+from os.path import join as pathJoin
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from laufire.sqlitex import Profiles, SQLiteDB, SQLiteSimpleTable
+
+# Helpers
+def timed(func):
+	start = time()
+	func()
+
+	return time() - start
+
+def benchmark(dbPath, profile, rowCount):
+	DB = SQLiteDB(dbPath)
+	DB.execute('CREATE TABLE items (`key` TEXT PRIMARY KEY, `value` TEXT)')
+	DB.close()
+
+	Table = SQLiteSimpleTable(dbPath, 'items', profile=profile)
+	Rows = [{'key': 'k%s' % i, 'value': 'v%s' % i} for i in range(rowCount)]
+	commitCount = min(rowCount, 200)
+
+	Results = {
+		'bulk': timed(lambda: Table.setMany(Rows)),
+		'commits': timed(lambda: [Table.set(Row) for Row in Rows[:commitCount]]) * rowCount / commitCount, # Scaled to the row count.
+		'reads': timed(lambda: [Table.get(Row['key']) for Row in Rows]),
+	}
+
+	Table.close()
+
+	return Results
+
+# Main
+def main():
+	rowCount = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+	tempDir = mkdtemp()
+
+	print 'rows: %s\n' % rowCount
+	print '%-16s%12s%12s%12s' % ('profile', 'bulk', 'commits', 'reads')
+
+	try:
+		for profile in [None] + sorted(Profiles.keys()):
+			Results = benchmark(pathJoin(tempDir, '%s.db' % profile), profile, rowCount)
+			print '%-16s%11.3fs%11.3fs%11.3fs' % (profile or 'default', Results['bulk'], Results['commits'], Results['reads'])
+
+	finally:
+		rmtree(tempDir)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,68 @@
+r"""Test the module, ecstore.
+"""
+import unittest
+
+from json import dumps
+
+from laufire.ecstore import clearStoreValues, getStore, getStoreTable, getStoreValues
+from laufire.filesys import abspath, ensureParent, removePath
+from laufire.parser import parse
+
+# Data
+Config = parse('data/config.yaml')
+tempDir = abspath(Config['Paths']['temp'])
+storePath = '%s/store.db' % tempDir
+Values = {'a': 1, 'b/c': 'c', 'b/d/e': [1, 2], 'b/d/f': {'g': 'h'}, 'ba': 'ba'}
+
+# Tests
+class TestECStore(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		from laufire import filesys
+		filesys.fsRoot = filesys.dirname(tempDir)
+
+	def setUp(self):
+		ensureParent(storePath)
+		Store = getStoreTable({'filePath': storePath})
+		Store.setMany([{'route': k, 'value': dumps(v)} for k, v in Values.iteritems()])
+		Store.close()
+
+	def tearDown(self):
+		clearStoreValues()
+		removePath(tempDir)
+
+	def test_getStore(self):
+		Eager = getStore(filePath=storePath)
+		Lazy = getStore(filePath=storePath, lazy=True)
+
+		for route in ['', 'a', 'b', 'b/d', 'b/d/e', 'b/d/f', 'ba']:
+			assert Eager[route] == Lazy[route], 'The lazy value of the route "%s" differs.' % route
+
+		assert Eager['b'] == {'c': 'c', 'd': {'e': [1, 2], 'f': {'g': 'h'}}}, 'Unexpected branch value.'
+		assert Lazy['b/d/f'] == {'g': 'h'}, 'Unexpected leaf value.'
+
+		self.assertRaises(KeyError, lambda: Lazy['missing'])
+		Lazy.close()
+
+	def test_getStoreValues(self):
+		Shared = getStoreValues(storePath)
+		assert Shared == Values, 'Unexpected values.'
+		assert getStoreValues(storePath) is Shared, 'The cached values were not reused.'
+		assert getStore(filePath=storePath, shared=True)['b/d'] == getStore(filePath=storePath)['b/d'], 'The shared store differs.'
+
+		Store = getStoreTable({'filePath': storePath})
+		Store.set({'route': 'a', 'value': dumps(2)})
+		Store.close()
+
+		assert getStoreValues(storePath)['a'] == 2, 'External writes were not detected.'
+		assert Shared['a'] == 1, 'The previously returned values were modified.'
+
+	def test_sharedValues_isolation(self):
+		First = getStore(filePath=storePath, shared=True)
+		Second = getStore(filePath=storePath, shared=True)
+
+		First['b/d/e'].append(3)
+		First['b/d/f']['g'] = 'changed'
+
+		assert Second['b/d/e'] == [1, 2] and Second['b/d/f'] == {'g': 'h'}, 'The modifications through a store leaked into another.'
+		assert getStoreValues(storePath) == Values, 'The modifications through a store leaked into the shared values.'
@@ -6,7 +6,7 @@ import re
 import unittest
 
 from laufire.logger import debug
-from laufire.filesys import abspath, collectPaths, copy, ensureCleanDir, ensureDir, getAncestor, isDescendant, linkTree, removePath, requireAncestor, setContent, stdPath
+from laufire.filesys import abspath, collectPaths, compress, compressTree, copy, copyContent, CopyStrategies, ensureCleanDir, ensureDir, extract, getAncestor, getContent, isDescendant, isSameFile, linkTree, makeLink, removePath, requireAncestor, setContent, stdPath
 from laufire.flow import forgive
 from laufire.parser import parse
 
@@ -53,6 +53,20 @@ def rebuildStructures():
 	ensureCleanDir(baseDir)
 	buildStructure(baseDir, FSDict)
 
+def withCopyStrategies(Strategies, func):
+	r"""Runs the given function with the given copy strategies.
+	"""
+	from laufire import filesys
+
+	Original = filesys.CopyStrategies
+	filesys.CopyStrategies = Strategies
+
+	try:
+		return func()
+
+	finally:
+		filesys.CopyStrategies = Original
+
 def testScenarios(tester, *Scenarios):
 	for Scenario in Scenarios:
 		tester(*Scenario)
@@ -75,6 +89,7 @@ class TestFileSys(unittest.TestCase):
 
 		assert isDescendant(baseDir, tempDir)
 		assert not isDescendant(tempDir, baseDir)
+		assert not isDescendant('%s-evil' % baseDir, baseDir), 'A sibling passed for a descendant.'
 
 	def test_requireAncestor(self):
 		assert not requireAncestor(baseDir, tempDir)
@@ -138,6 +153,67 @@ class TestFileSys(unittest.TestCase):
 
 		#Pending: Test regex patterns.
 
+	def test_collectPaths_links(self):
+		rebuildStructures()
+
+		linkedDir = '%s/linked' % tempDir
+		makeLink(baseDir, linkedDir)
+
+		Collected = dict(collectPaths(tempDir, '*|linked/**'))
+		assert Collected['linked'] == 3, 'Linked dirs should be collected with the pathType 3.'
+		assert Collected['base'] == 2
+		assert cmp({k[len('linked/'):]: v for k, v in Collected.iteritems() if k.startswith('linked/')}, FSDict) == 0, 'Linked dirs were not traversed.'
+
+		assert 'linked/file1.txt' not in dict(collectPaths(tempDir, followlinks=False)), 'Linked dirs were traversed, though followlinks was False.'
+
+	def test_getMatchers_cache(self):
+		from laufire import filesys
+
+		cacheSize = filesys.patternCacheSize
+		filesys.patternCacheSize = 4
+
+		try:
+			Matchers = filesys.getMatchers('*.keep')
+
+			for i in range(10):
+				filesys.getMatchers('*.%s' % i)
+				assert filesys.getMatchers('*.keep') is Matchers, 'The recently used pattern was evicted.'
+
+			assert len(filesys.PatternCache) <= 4, 'The cache is not bounded.'
+
+		finally:
+			filesys.patternCacheSize = cacheSize
+
+	def test_scan_stats(self):
+		import os
+		from laufire import filesys
+
+		rebuildStructures()
+		makeLink(baseDir, '%s/linked' % tempDir)
+
+		Calls = {'lstat': 0, 'stat': 0}
+		Originals = os.lstat, os.stat
+
+		def counter(name, original):
+			def count(path):
+				Calls[name] += 1
+				return original(path)
+
+			return count
+
+		os.lstat, os.stat = counter('lstat', Originals[0]), counter('stat', Originals[1])
+
+		try:
+			Entries = list(filesys._getScanner()(tempDir)) #pylint: disable=protected-access
+
+		finally:
+			os.lstat, os.stat = Originals
+
+		assert dict((name, (isDir, isLink)) for name, isDir, isLink in Entries)['linked'] == (True, True), 'The linked dir was not detected.'
+
+		if not hasattr(os, 'scandir'): # #Note: The listdir fallback.
+			assert Calls == {'lstat': len(Entries), 'stat': 1}, 'Unexpected stat calls: %s' % Calls
+
 	def test_copy(self): # #Pending: Test all the argument combinations.
 		rebuildStructures()
 
@@ -146,6 +222,89 @@ class TestFileSys(unittest.TestCase):
 
 		assert cmp(getStructureDict(baseDir), getStructureDict(target)) == 0, 'The structures do not match.'
 
+	def test_copy_workers(self):
+		rebuildStructures()
+
+		target = '%s/base1' % tempDir
+		copy(baseDir, target, workers=4)
+
+		assert cmp(getStructureDict(baseDir), getStructureDict(target)) == 0, 'The structures do not match.'
+		assert getContent('%s/dir1/file1.txt' % target) == 'dir1/file1.txt', 'The contents do not match.'
+
+	def test_copy_workers_pattern(self):
+		srcDir = '%s/src' % tempDir
+
+		for i in range(20):
+			for j in range(3):
+				for k in range(8):
+					setContent('%s/d%s/s%s/f%s.txt' % (srcDir, i, j, k), '%s %s %s' % (i, j, k))
+
+		for i in range(5): # #Note: The dirs are made concurrently, only on races. Hence the repetitions.
+			target = '%s/tgt%s' % (tempDir, i)
+			copy(srcDir, target, pattern='**.txt', workers=16)
+
+			assert getStructureDict(target, excludeDirs=True) == getStructureDict(srcDir, excludeDirs=True), 'The structures do not match.'
+
+	def test_copy_sync(self):
+		rebuildStructures()
+
+		target = '%s/base1' % tempDir
+		Summary = copy(baseDir, target, sync=True)
+		assert cmp(getStructureDict(baseDir), getStructureDict(target)) == 0, 'The structures do not match.'
+		assert Summary == {'added': len(FSDict), 'updated': 0, 'removed': 0}, 'Unexpected summary: %s' % Summary
+
+		assert copy(baseDir, target, sync=True) == {'added': 0, 'updated': 0, 'removed': 0}, 'Unchanged files were copied.'
+
+		setContent('%s/file1.txt' % baseDir, 'changed')
+		removePath('%s/dir1/dir1' % baseDir)
+		setContent('%s/dir2/new.txt' % baseDir, 'new')
+
+		Summary = copy(baseDir, target, sync=True, workers=2, useMD5=True)
+		assert cmp(getStructureDict(baseDir), getStructureDict(target)) == 0, 'The structures do not match.'
+		assert getContent('%s/file1.txt' % target) == 'changed', 'The changed file was not copied.'
+		assert Summary == {'added': 1, 'updated': 1, 'removed': 1}, 'Unexpected summary: %s' % Summary
+
+	def test_copy_sync_links(self):
+		rebuildStructures()
+
+		target = '%s/base1' % tempDir
+		outside = '%s/outside' % tempDir
+		ensureDir(outside)
+		ensureDir(target)
+		makeLink(outside, '%s/dir1' % target) # A linked dir in the target, in place of a dir of the source.
+
+		copy(baseDir, target, sync=True)
+		assert not getStructureDict(outside), 'The files were copied through the linked dir.'
+		assert getStructureDict(target)['dir1'] == 2 and cmp(getStructureDict(baseDir), getStructureDict(target)) == 0, 'The linked dir was not replaced.'
+
+	def test_isSameFile(self):
+		from os import utime
+
+		srcPath = '%s/src.txt' % tempDir
+		tgtPath = '%s/tgt.txt' % tempDir
+		setContent(srcPath, 'aaa')
+		utime(srcPath, (1000000000.2, 1000000000.2))
+		copy(srcPath, tgtPath, sync=True)
+
+		assert isSameFile(srcPath, tgtPath), 'The copy differs.'
+
+		setContent(srcPath, 'bbb') # An edit within the same second, that keeps the size.
+		utime(srcPath, (1000000000.7, 1000000000.7))
+		assert not isSameFile(srcPath, tgtPath), 'The edit was not detected.'
+		assert copy(srcPath, tgtPath, sync=True)['updated'] == 1 and getContent(tgtPath) == 'bbb', 'The edit was not synced.'
+
+	def test_copyContent(self):
+		srcPath = '%s/source.bin' % tempDir
+		content = ''.join(chr(i % 256) for i in range(300000))
+		setContent(srcPath, content)
+
+		for Strategy in CopyStrategies + [('readinto', None)]:
+			tgtPath = '%s/%s.bin' % (tempDir, Strategy[0])
+			strategy = withCopyStrategies([Strategy] if Strategy[1] else [], lambda: copyContent(srcPath, tgtPath)) #pylint: disable=cell-var-from-loop
+
+			assert strategy in (Strategy[0], 'readinto'), 'Unexpected copy strategy: %s' % strategy # #Note: Unsupported strategies fall back to readinto.
+			assert getContent(tgtPath) == content, 'The contents copied with %s do not match.' % strategy
+
 	def test_linkTree(self): # #Pending: Test all the argument combinations.
 		rebuildStructures()
 
@@ -163,3 +322,168 @@ class TestFileSys(unittest.TestCase):
 
 		testPattern('**!**.txt')
 		testPattern('**.txt', True)
+
+	def test_linkTree_sync(self):
+		rebuildStructures()
+
+		target = '%s/base1' % tempDir
+		linkTree(baseDir, target, sync=True)
+		assert cmp(getStructureDict(baseDir), getStructureDict(target)) == 0, 'The structures do not match.'
+		assert linkTree(baseDir, target, sync=True) == {'added': 0, 'updated': 0, 'removed': 0}, 'Existing links were relinked.'
+
+		removePath('%s/dir1/file1.txt' % baseDir)
+		Summary = linkTree(baseDir, target, sync=True)
+		assert cmp(getStructureDict(baseDir), getStructureDict(target)) == 0, 'The structures do not match.'
+		assert Summary == {'added': 0, 'updated': 0, 'removed': 1}, 'Unexpected summary: %s' % Summary
+
+		Summary = linkTree(baseDir, target, sync=True, hardLink=True)
+		assert Summary['updated'] == len([v for v in getStructureDict(baseDir).values() if v == 1]), 'Symlinks were not replaced with hard links.'
+
+	def test_compressTree(self):
+		import os
+		from distutils.spawn import find_executable as which
+		from zipfile import ZipFile, ZIP_STORED
+		from laufire import filesys
+		from laufire.shell import call
+
+		rebuildStructures()
+
+		Files = sorted(k for k, v in getStructureDict(baseDir).items() if v == 1)
+		zipPath = '%s/base.zip' % tempDir
+		maxInMemorySize = filesys.maxInMemorySize
+
+		for limit in (maxInMemorySize, 0): # #Note: A limit of 0 deflates every file into temp files.
+			for storePattern in ('**file1.txt', None): # #Note: Without a storePattern, every member is pre-deflated; none is written by zipfile.
+				filesys.maxInMemorySize = limit
+
+				try:
+					compressTree(baseDir, zipPath, compressLevel=9, storePattern=storePattern, workers=2)
+
+				finally:
+					filesys.maxInMemorySize = maxInMemorySize
+
+				with ZipFile(zipPath) as Z:
+					assert Z.testzip() is None, 'The archive is corrupt.'
+					assert sorted(Z.namelist()) == Files, 'The members do not match.'
+					assert all(Z.read(name) == getContent('%s/%s' % (baseDir, name)) for name in Files), 'The contents do not match.'
+					assert all((Info.compress_type == ZIP_STORED) == bool(storePattern and Info.filename.endswith('file1.txt')) for Info in Z.infolist()), 'The storePattern was not respected.'
+
+				if which('unzip'):
+					assert call('unzip -tq "%s"' % zipPath)['code'] == 0, 'unzip rejected the archive.'
+
+				assert not [name for name in os.listdir(tempDir) if name.startswith('tmp')], 'The temp files were not removed.'
+
+		def fail(*dummy):
+			raise IOError('Simulated failure.')
+
+		writeDeflated = filesys._writeDeflated #pylint: disable=protected-access
+		filesys._writeDeflated = fail #pylint: disable=protected-access
+
+		os.remove(zipPath)
+
+		try:
+			self.assertRaises(IOError, compressTree, baseDir, zipPath, workers=2)
+
+		finally:
+			filesys._writeDeflated = writeDeflated #pylint: disable=protected-access
+
+		assert not os.path.exists(zipPath) and not [name for name in os.listdir(tempDir) if name.startswith('tmp')], 'The partial archive (or the temp files) were not removed.'
+
+		compressTree(baseDir, zipPath, '**!**file1.txt')
+
+		with ZipFile(zipPath) as Z:
+			assert sorted(Z.namelist()) == [name for name in Files if not name.endswith('file1.txt')], 'The pattern was not respected.'
+
+		compress(baseDir, zipPath)
+
+		with ZipFile(zipPath) as Z:
+			assert sorted(Z.namelist()) == Files, 'compress does not match compressTree.'
+
+	def test_extract(self):
+		import tarfile
+
+		rebuildStructures()
+
+		Files = sorted(k for k, v in getStructureDict(baseDir).items() if v == 1)
+		zipPath = '%s/base.zip' % tempDir
+		target = '%s/extracted' % tempDir
+		compressTree(baseDir, zipPath)
+
+		assert extract(zipPath, target, '**file1.txt', workers=2) == {'extracted': len([name for name in Files if name.endswith('file1.txt')]), 'skipped': 0}, 'The pattern was not respected.'
+		assert sorted(getStructureDict(target, excludeDirs=True)) == [name for name in Files if name.endswith('file1.txt')], 'Unexpected members were extracted.'
+
+		setContent('%s/file1.txt' % target, 'changed')
+		Summary = extract(zipPath, target, workers=2)
+		assert Summary == {'extracted': len(Files) - Summary['skipped'], 'skipped': Summary['skipped']} and Summary['skipped'] > 0, 'The extracted members were not skipped.'
+		assert all(getContent('%s/%s' % (target, name)) == getContent('%s/%s' % (baseDir, name)) for name in Files), 'The contents do not match.'
+
+		assert forgive(lambda: extract(zipPath, '/')), 'Extracted outside the fsRoot.'
+
+		tarPath = '%s/base.tar.gz' % tempDir
+		Tar = tarfile.open(tarPath, 'w:gz')
+		Tar.add(baseDir, '.')
+		Tar.close()
+
+		target = '%s/untarred' % tempDir
+		extract(tarPath, target, 'dir1/**!**file1.txt')
+		assert sorted(getStructureDict(target, excludeDirs=True)) == [name for name in Files if name.startswith('dir1/') and not name.endswith('file1.txt')], 'The tar was not extracted properly.'
+
+	def test_extract_links(self):
+		import os
+		import tarfile
+		from StringIO import StringIO
+
+		def makeTar(name, Links, memberName):
+			tarPath = '%s/%s.tar' % (tempDir, name)
+			Tar = tarfile.open(tarPath, 'w')
+
+			for linkName, linkname in Links:
+				Info = tarfile.TarInfo(linkName)
+				Info.type = tarfile.SYMTYPE
+				Info.linkname = linkname
+				Tar.addfile(Info)
+
+			Info = tarfile.TarInfo(memberName)
+			Info.size = 4
+			Tar.addfile(Info, StringIO('evil'))
+			Tar.close()
+
+			return tarPath
+
+		target = '%s/untarred' % tempDir
+		ensureDir(target)
+		os.symlink('..', '%s/existing' % target) # A link, not from the tar.
+
+		for tarPath in (makeTar('chained', [('l1', '.'), ('l1/l2', '..')], 'l2/evil.txt'), makeTar('existing', [], 'existing/evil.txt')):
+			assert forgive(lambda: extract(tarPath, target)), 'The members were led out of the target.'
+			assert not os.path.exists('%s/evil.txt' % tempDir), 'A member was extracted outside the target.'
+
+		assert forgive(lambda: extract(makeTar('under', [('link', '.')], 'link/file.txt'), '%s/under' % tempDir)), 'A member was extracted under a symlink.'
+
+	def test_extract_workers(self):
+		from zipfile import ZipFile
+
+		srcDir = '%s/src' % tempDir
+		zipPath = '%s/src.zip' % tempDir
+
+		for i in range(20):
+			for j in range(3):
+				for k in range(8):
+					setContent('%s/d%s/s%s/f%s.txt' % (srcDir, i, j, k), '%s %s %s' % (i, j, k))
+
+		with ZipFile(zipPath, 'w') as Z: # #Note: ZipFile.write adds the dir entries, unlike compressTree.
+			for path, dummy in sorted(collectPaths(srcDir)):
+				Z.write('%s/%s' % (srcDir, path), path)
+
+			Z.writestr('../escaped.txt', 'escaped')
+
+		Structure = getStructureDict(srcDir)
+		count = len(Structure) + 1
+
+		for i in range(5): # #Note: The dirs are made concurrently, only on races. Hence the repetitions.
+			target = '%s/tgt%s' % (tempDir, i)
+
+			assert extract(zipPath, target, workers=16) == {'extracted': count, 'skipped': 0}, 'Unexpected summary.'
+			assert getStructureDict(target) == dict(Structure, **{'escaped.txt': 1}), 'The structures do not match.'
+
+		assert extract(zipPath, target, workers=16) == {'extracted': 0, 'skipped': count}, 'The extracted members, dirs included, were not skipped.'
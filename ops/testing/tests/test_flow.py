@@ -0,0 +1,55 @@
+r"""Test the module, flow.
+"""
+import unittest
+
+from laufire.flow import getDelays, retry, waitFor, waitForMany
+
+# Helpers
+def getCounter(successAt, error=None):
+	r"""Returns a function, that returns its call count from the given call onwards, and fails (returns None or raises the given error) till then.
+	"""
+	State = {'calls': 0}
+
+	def counter():
+		State['calls'] += 1
+
+		if State['calls'] < successAt:
+			if error:
+				raise error
+
+			return None
+
+		return State['calls']
+
+	counter.State = State
+
+	return counter
+
+# Tests
+class TestFlow(unittest.TestCase):
+	def test_getDelays(self):
+		Delays = getDelays(1, 2, 5)
+		assert [next(Delays) for _ in range(5)] == [1, 2, 4, 5, 5], 'The delays are not backed-off.'
+
+		Delays = getDelays(1, jitter=0.5)
+		assert all(0.5 <= next(Delays) <= 1.5 for _ in range(100)), 'The jitter is out of bounds.'
+
+	def test_retry(self):
+		assert retry(getCounter(3), delay=0.001) == 3
+		assert retry(getCounter(5), delay=0.001) is None, 'The attempts were not limited.'
+		assert retry(getCounter(3, IOError()), delay=0.001, Exceptions=(IOError,)) == 3, 'The filtered exceptions were not retried.'
+
+		self.assertRaises(ValueError, retry, getCounter(3, ValueError()), delay=0.001, Exceptions=(IOError,))
+		self.assertRaises(IOError, retry, getCounter(5, IOError()), delay=0.001, Exceptions=(IOError,))
+
+		counter = getCounter(100)
+		retry(counter, repeat=-1, delay=0.01, timeout=0.05)
+		assert counter.State['calls'] < 10, 'The timeout was not enforced.'
+
+	def test_waitFor(self):
+		assert waitFor(getCounter(3, IOError()), 1, interval=0.001, Exceptions=(IOError,)) == 3
+		self.assertRaises(Exception, waitFor, getCounter(100), 0.05, interval=0.01)
+
+	def test_waitForMany(self):
+		assert waitForMany([getCounter(i) for i in range(1, 4)], 1, interval=0.001) == [1, 2, 3]
+		self.assertRaises(Exception, waitForMany, [getCounter(1), getCounter(100)], 0.05, interval=0.01)
@@ -0,0 +1,60 @@
+r"""Test the module, interpolator.
+"""
+import unittest
+
+from laufire.extensions import nest, unnest
+from laufire.interpolator import Interpolator
+from laufire.yamlex import YamlEx
+
+# Data
+Values = {
+
+	'Paths/base': '/base',
+	'Paths/work': '{{ Paths.temp }}/work',
+	'Paths/temp': '{{ Paths.base }}/temp',
+	'name': 'laufire',
+	'title': '{{ name|upper }} at {{ Paths["work"] }}',
+	'runtime': '{{ undefinedVar }}',
+	'count': 3,
+}
+
+# Tests
+class TestInterpolator(unittest.TestCase):
+	def test_render(self):
+		Y = YamlEx()
+		Y.setData(nest(dict(Values)))
+		Y.interpolate()
+
+		assert Interpolator(Values).Values == unnest(Y.Data), 'The interpolated values differ from those of YamlEx.'
+
+	def test_set(self):
+		I = Interpolator(Values)
+
+		assert I.set('Paths/base', '/other') == '/other'
+		assert I['Paths/work'] == '/other/temp/work', 'The dependents were not re-rendered.'
+		assert I['title'] == 'LAUFIRE at /other/temp/work', 'The indirect dependents were not re-rendered.'
+
+		assert I.set('undefinedVar', '{{ count }}') == '3', 'New templates were not rendered.'
+		assert I['runtime'] == '3', 'The values referring to new routes were not re-rendered.'
+
+		I.set('Paths/temp', '/tmp')
+		assert I['Paths/work'] == '/tmp/work', 'Templates replaced with plain values were not re-rendered.'
+
+		I.set('Paths/base', '/base')
+		assert I['Paths/work'] == '/tmp/work', 'Former dependents were re-rendered.'
+
+	def test_nested(self):
+		Nested = {'a': 'x', 'c/d': {'e': '{{ a }}y', 'List': ['{{ a }}', 1]}, 'ref': '{{ c.d.e }}z'}
+		I = Interpolator(Nested)
+
+		assert I['c/d'] == {'e': 'xy', 'List': ['x', 1]}, 'The nested templates were not rendered.'
+		assert I['ref'] == 'xyz', 'The references to the nested templates were not rendered.'
+		assert Nested['c/d']['e'] == '{{ a }}y', 'The source value was modified.'
+
+		Y = YamlEx()
+		Y.setData(nest(dict(Nested)))
+		Y.interpolate()
+		assert Y.Data['c']['d'] == I['c/d'] and Y.Data['ref'] == I['ref'], 'The interpolated values differ from those of YamlEx.'
+
+		I.set('a', 'w')
+		assert I['c/d'] == {'e': 'wy', 'List': ['w', 1]} and I['ref'] == 'wyz', 'The nested templates were not re-rendered.'
@@ -0,0 +1,83 @@
+r"""Test the module, parser.
+"""
+import unittest
+from os import chmod, stat, utime
+
+from laufire import parser
+from laufire.filesys import abspath, exists, removePath, setContent
+from laufire.parser import parse, clearParseCache
+from laufire.yamlex import YamlEx
+
+# Data
+Config = parse('data/config.yaml')
+tempDir = abspath(Config['Paths']['temp'])
+yamlPath = '%s/data.yaml' % tempDir
+
+# Tests
+class TestParser(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		from laufire import filesys
+		filesys.fsRoot = filesys.dirname(tempDir)
+
+	def setUp(self):
+		clearParseCache()
+
+	def tearDown(self):
+		removePath(tempDir)
+
+	def test_parse(self):
+		setContent(yamlPath, "base: /base\nPaths:\n  temp: '{{ base }}/temp'\nname: laufire\n")
+
+		First = parse(yamlPath)
+		assert First.Data == YamlEx(yamlPath).interpolate().Data, 'The parsed data differ from that of YamlEx.'
+		assert First.Data.keys() == ['base', 'Paths', 'name'], 'The order of the keys was not preserved.'
+
+		First['Paths']['temp'] = 'changed'
+		assert parse(yamlPath)['Paths']['temp'] == '/base/temp', 'The cached data were shared between the calls.'
+
+		setContent(yamlPath, "base: /other\nPaths:\n  temp: '{{ base }}/temp'\n")
+		utime(yamlPath, (0, 0))
+		assert parse(yamlPath)['Paths']['temp'] == '/other/temp', 'The changed file was not re-parsed.'
+
+	def test_sidecar(self):
+		setContent(yamlPath, 'value: 1\n')
+		parse(yamlPath, sidecar=True)
+
+		sidecarPath = '%s.yaml.pickle' % yamlPath
+		assert exists(sidecarPath), 'The sidecar was not written.'
+
+		clearParseCache()
+		load = parser.loadYAML
+		parser.loadYAML = None # Fails any parsing.
+
+		try:
+			assert parse(yamlPath, sidecar=True)['value'] == 1, 'The sidecar was not reused.'
+
+			assert not stat(sidecarPath).st_mode & 0o077, 'The sidecar is accessible to others.'
+			chmod(sidecarPath, 0o666)
+			clearParseCache()
+			self.assertRaises(TypeError, lambda: parse(yamlPath, sidecar=True)) # #Note: The sidecar isn't trusted, hence the file is parsed (with the failing parser).
+
+		finally:
+			parser.loadYAML = load
+
+		clearParseCache()
+		setContent(sidecarPath, 'invalid')
+		assert parse(yamlPath, sidecar=True)['value'] == 1, 'Invalid sidecars were not ignored.'
+
+	def test_parseYAML_KWArgs(self):
+		import logging
+		from laufire.parser import parseYAML
+
+		setContent(yamlPath, 'value: 1\n')
+		Logger = logging.getLogger('hiyapyco')
+		level = Logger.level
+
+		try:
+			Logger.setLevel(logging.DEBUG)
+			assert parseYAML(yamlPath, interpolate=False, loglevel='ERROR')['value'] == 1
+			assert Logger.level == logging.ERROR, 'The loglevel was not passed to HiYaPyCo.'
+
+		finally:
+			Logger.setLevel(level)
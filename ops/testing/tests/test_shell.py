@@ -0,0 +1,82 @@
+r"""Test the module, shell.
+"""
+import sys
+import unittest
+
+from pipes import quote
+
+from laufire.shell import assertShell, piped, runMany, stream, Tail
+
+# Helpers
+def getPythonCommand(script):
+	return '%s -c %s' % (quote(sys.executable), quote(script))
+
+# Tests
+class TestShell(unittest.TestCase):
+	def test_stream(self):
+		command = getPythonCommand("import sys\nfor i in range(5000): sys.stdout.write('out %d\\n' % i); sys.stderr.write('err %d\\n' % i)\nsys.exit(3)") # Writes more than the pipe buffers could hold.
+		Result = {}
+		Received = {'out': [], 'err': []}
+
+		for name, text in stream(command, tailSize=9, Result=Result):
+			Received[name].append(text)
+
+		assert len(Received['out']) == 5000 and Received['err'][-1] == 'err 4999\n', 'Some lines were missed.'
+		assert Result == {'out': u'out 4999\n', 'err': u'err 4999\n', 'code': 3}, 'The tails are wrong.'
+		self.assertRaises(Exception, assertShell, Result)
+
+		Chunks = list(stream(getPythonCommand("print('x' * 10000)"), lines=False, chunkSize=1024))
+		assert ''.join(text for _, text in Chunks) == 'x' * 10000 + '\n', 'The chunks are incomplete.'
+		assert max(len(text) for _, text in Chunks) <= 1024, 'The chunks exceed the chunk size.'
+
+	def test_streamClose(self):
+		Result = {}
+		Output = stream(getPythonCommand("import time\nwhile True: print('tick'); time.sleep(0.01)"), Result=Result)
+
+		assert next(Output) == ('out', 'tick\n')
+		Output.close()
+
+		assert Result['code'] is not None, 'The process was not killed.'
+
+	def test_tail(self):
+		T = Tail(5)
+
+		for text in ['abc', 'defg', 'h', '', 'ijklmnop']:
+			T.append(text)
+
+		assert T.getvalue() == 'lmnop'
+
+	def test_piped(self):
+		producer = getPythonCommand("for i in range(100000): print(i)") # Produces more than the pipe buffers could hold.
+		counter = getPythonCommand("import sys; sys.stdout.write(str(len(sys.stdin.readlines())))")
+
+		for concurrent in (False, True):
+			Result = piped(producer, counter, concurrent=concurrent)
+			assert Result['out'] == '100000' and Result['Codes'] == [0, 0], 'The stages were not piped.'
+
+		Result = piped(getPythonCommand("import sys; sys.stderr.write('failed'); sys.exit(2)"), counter, concurrent=True)
+		assert Result['code'] == 2 and Result['err'] == 'failed' and Result['Codes'] == [2, 0], 'The failing stage was not reported.'
+
+		from time import time
+
+		start = time()
+		self.assertRaises(OSError, piped, getPythonCommand("import time; time.sleep(5)"), 'laufire-missing-command', concurrent=True)
+		assert time() - start < 3, 'The started stages were not killed.'
+
+	def test_runMany(self):
+		from time import time
+
+		start = time()
+		Results = runMany([getPythonCommand("import time; time.sleep(0.3); print(%d)" % i) for i in range(4)], concurrency=4)
+		assert time() - start < 1, 'The commands were not run concurrently.'
+		assert [Result['out'] for Result in Results] == [u'%d\n' % i for i in range(4)], 'The results are out of order.'
+
+		Results = runMany([getPythonCommand("import time; time.sleep(5)"), getPythonCommand("print(1)")], timeout=0.3)
+		assert Results[0]['timedOut'] and Results[0]['code'] and Results[1]['code'] == 0, 'The timeout was not enforced.'
+
+		Results = runMany([getPythonCommand("import sys; sys.exit(1)")] + [getPythonCommand("import time; time.sleep(5)")] * 3, concurrency=2, failFast=True)
+		assert Results[0]['code'] == 1 and Results[1]['code'] and Results[2:] == [None, None], 'The remaining commands were not stopped.'
+
+		start = time()
+		self.assertRaises(OSError, runMany, [getPythonCommand("import time; time.sleep(5)"), 'laufire-missing-command', getPythonCommand("print(1)")], concurrency=2)
+		assert time() - start < 3, 'The running commands were not killed.'
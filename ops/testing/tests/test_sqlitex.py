@@ -0,0 +1,95 @@
+r"""Test the module, sqlitex.
+"""
+import unittest
+
+from laufire import sqlitex
+from laufire.filesys import abspath, ensureParent, removePath, setContent
+from laufire.parser import parse
+from laufire.sqlitex import SQLiteDB, SQLiteSimpleTable
+
+# Data
+Config = parse('data/config.yaml')
+tempDir = abspath(Config['Paths']['temp'])
+dbPath = '%s/test.db' % tempDir
+
+# Helpers
+def getTable():
+	removePath(dbPath)
+	ensureParent(dbPath)
+
+	DB = SQLiteDB(dbPath)
+	DB.execute('CREATE TABLE items (`key` TEXT PRIMARY KEY, `a` TEXT, `b` INTEGER)')
+	DB.close()
+
+	return SQLiteSimpleTable(dbPath, 'items')
+
+# Tests
+class TestSQLiteX(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		from laufire import filesys
+		filesys.fsRoot = filesys.dirname(tempDir)
+
+	def tearDown(self):
+		removePath(tempDir)
+
+	def test_set(self):
+		original = sqlitex.supportsUpsert
+
+		try:
+			for supportsUpsert in ((True, False) if original else (False,)): # #Note: Upserts can't be forced on SQLite versions without them.
+				sqlitex.supportsUpsert = supportsUpsert
+				Table = getTable()
+
+				Table.set({'key': 'k1', 'a': 'x', 'b': 1})
+				Table.set({'key': 'k1', 'b': 2})
+				Table.set({'key': 'k2'})
+				Table.set({'key': 'k3', 'a': 'z'}, dontInsert=True)
+
+				Got = Table.getAll()
+				Table.close()
+
+				assert Got == {'k1': {'key': 'k1', 'a': 'x', 'b': 2}, 'k2': {'key': 'k2', 'a': None, 'b': None}}, 'Unexpected rows with supportsUpsert = %s.' % supportsUpsert
+
+		finally:
+			sqlitex.supportsUpsert = original
+
+	def test_setMany(self):
+		Table = getTable()
+		Rows = [{'key': 'k%s' % i, 'a': str(i), 'b': i} for i in range(1000)] + [{'key': 'k1', 'b': -1}]
+
+		with Table.batch():
+			Table.setMany(Rows)
+			Table.delete('k0')
+
+		Got = Table.getAll()
+		Table.close()
+
+		assert len(Got) == 999, 'Unexpected row count.'
+		assert Got['k1'] == {'key': 'k1', 'a': '1', 'b': -1}, 'Rows were not updated.'
+
+	def test_profiles(self):
+		getTable().close()
+
+		for profile in sqlitex.Profiles:
+			DB = SQLiteDB(dbPath, profile=profile, pragmas={'cache_size': -1024})
+			Pragmas = dict(sqlitex.getPragmas(profile))
+
+			assert DB.execute('PRAGMA journal_mode;').fetchone()[0].upper() == Pragmas['journal_mode'], 'The profile %s was not applied.' % profile
+			assert DB.execute('PRAGMA cache_size;').fetchone()[0] == -1024, 'The pragmas were not applied over the profile %s.' % profile
+
+			DB.reopen()
+			assert DB.execute('PRAGMA cache_size;').fetchone()[0] == -1024, 'The pragmas were not reapplied on reopening.'
+			DB.close()
+
+	def test_importTablesFromFile(self):
+		tsvPath = '%s/rows.tsv' % tempDir
+		setContent(tsvPath, 'key\tvalue\n' + ''.join('k%s\tv%s\n' % (i, i) for i in range(250)))
+		removePath(dbPath)
+
+		Progress = []
+		count = sqlitex.importTablesFromFile(dbPath, tsvPath, 'rows', batchSize=100, progress=Progress.append, vacuum=False, createFromHeader=True)
+
+		assert count == 250, 'Unexpected row count.'
+		assert Progress == [100, 200, 250], 'Unexpected progress: %s' % Progress
+		assert sqlitex.execute(dbPath, 'SELECT `value` FROM rows WHERE `key` = "k42"') == [(u'v42',)], 'The rows were not imported.'
@@ -0,0 +1,336 @@
+r"""Test the module, ssh.
+
+#Note: The tests use stand-in clients, so that they wouldn't need a network (nor paramiko).
+"""
+import unittest
+
+from pipes import quote
+from threading import Thread
+from time import sleep
+
+from laufire import ssh
+from laufire.filesys import abspath, copyContent, getContent, removePath, setContent
+from laufire.parser import parse
+from laufire.shell import call
+from laufire.mock.ssh import SSHClientMocker, executeMany
+from laufire.ssh import SSHBridge, SSHPool, uploadArchive, uploadDelta, uploadTree
+
+# Data
+SSHConfig = {'host': 'localhost', 'username': 'user', 'password': ''}
+Config = parse('data/config.yaml')
+tempDir = abspath(Config['Paths']['temp'])
+
+# Helpers
+class FakeClient:
+	Created = []
+
+	def __init__(self, SSHConfig):
+		self.SSHConfig = SSHConfig
+		self.active = True
+		self.closed = False
+		FakeClient.Created.append(self)
+
+	def isActive(self):
+		return self.active
+
+	def close(self):
+		self.closed = True
+
+	def execute(self, command, onOutput=None): #pylint: disable=unused-argument
+		return {'out': command, 'err': '', 'code': 0}
+
+class LocalSFTP:
+	r"""Stands for SFTP connections, by copying the files locally. The first put of each file fails.
+	"""
+	Puts = {}
+
+	def put(self, localPath, remotePath):
+		LocalSFTP.Puts[localPath] = LocalSFTP.Puts.get(localPath, 0) + 1
+
+		if LocalSFTP.Puts[localPath] == 1 and localPath.endswith('0.txt'):
+			raise IOError('Simulated failure.')
+
+		copyContent(localPath, remotePath)
+
+	def utime(self, path, Times): #pylint: disable=no-self-use
+		from os import utime
+
+		utime(path, Times)
+
+	def close(self):
+		pass
+
+class LocalClient(FakeClient):
+	Commands = []
+
+	def execute(self, command):
+		LocalClient.Commands.append(command)
+
+		return call(command)
+
+	def open_sftp(self): #pylint: disable=no-self-use
+		return LocalSFTP()
+
+	def exec_command(self, command): #pylint: disable=no-self-use
+		from subprocess import Popen, PIPE
+
+		LocalClient.Commands.append(command)
+		Process = Popen(command, shell=True, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+
+		return LocalChannelFile(Process, Process.stdin), LocalChannelFile(Process, Process.stdout), LocalChannelFile(Process, Process.stderr)
+
+class LocalChannelFile:
+	r"""Stands for the channel files of paramiko, over the pipes of a local process.
+	"""
+	def __init__(self, Process, File):
+		self.channel = self
+		self.Process = Process
+		self.File = File
+
+	def __getattr__(self, attr):
+		return getattr(self.File, attr)
+
+	def shutdown_write(self):
+		self.Process.stdin.close()
+
+	def recv_exit_status(self):
+		return self.Process.wait()
+
+# Tests
+class TestSSHPool(unittest.TestCase):
+	def setUp(self):
+		FakeClient.Created = []
+
+	def test_checkout(self):
+		Pool = SSHPool(keepalive=10, clientFactory=FakeClient)
+
+		with Pool.checkout(SSHConfig) as Client:
+			assert Client.SSHConfig['keepalive'] == 10, 'The keepalive was not set.'
+
+		with Pool.checkout(SSHConfig) as Reused:
+			assert Reused is Client, 'The client was not reused.'
+
+		with Pool.checkout(dict(SSHConfig, username='other')) as Other:
+			assert Other is not Client, 'The clients were shared across the keys.'
+
+		Client.active = False
+
+		with Pool.checkout(SSHConfig) as Replaced:
+			assert Replaced is not Client and Client.closed, 'The inactive client was reused.'
+
+		Pool.maxIdle = 0
+		sleep(0.01)
+		Pool.acquire(dict(SSHConfig, host='other'))
+		assert Replaced.closed and Other.closed, 'The idle clients were not evicted.'
+
+	def test_maxSize(self):
+		Pool = SSHPool(maxSize=2, clientFactory=FakeClient)
+		Used = []
+
+		def worker():
+			with Pool.checkout(SSHConfig) as Client:
+				Used.append(Client)
+				sleep(0.01)
+
+		Threads = [Thread(target=worker) for _ in range(8)]
+
+		for thread in Threads:
+			thread.start()
+
+		for thread in Threads:
+			thread.join()
+
+		assert len(Used) == 8 and len(FakeClient.Created) == 2, 'The size of the pool was not limited.'
+
+	def test_bridge(self):
+		Pool = SSHPool(clientFactory=FakeClient)
+		Bridge = SSHBridge({'SSH': SSHConfig, 'Gateway': {'name': 'gateway'}}, Pool)
+
+		assert Bridge.iexecute('echo {name}')['out'] == 'echo gateway'
+		Bridge.iexecute('echo')
+		assert len(FakeClient.Created) == 1, 'The bridge did not reuse the pooled client.'
+
+	def test_discardUnlocked(self):
+		Pool = SSHPool(clientFactory=FakeClient)
+		LockedCloses = []
+
+		def close(Client):
+			def tryLock():
+				if Pool._condition.acquire(False): #pylint: disable=protected-access
+					Pool._condition.release() #pylint: disable=protected-access
+
+				else:
+					LockedCloses.append(Client)
+
+			thread = Thread(target=tryLock) # #Note: The lock is re-entrant. Hence it's tried from another thread.
+			thread.start()
+			thread.join()
+
+		with Pool.checkout(SSHConfig) as Client:
+			Client.close = lambda: close(Client)
+			Client.active = False
+
+		Pool.acquire(SSHConfig)
+		Pool.close()
+		assert not LockedCloses, 'The clients were closed while holding the lock of the pool.'
+
+	def test_getGateway(self):
+		from laufire.mockable import Gateways, getGateway
+
+		Pool = SSHPool(clientFactory=FakeClient)
+		Config = {'SSH': SSHConfig, 'Gateway': {'name': 'gateway'}}
+
+		try:
+			Gateway = getGateway(Config, False)
+			Pooled = getGateway(Config, False, Pool=Pool)
+			assert Pooled is not Gateway and Pooled is getGateway(Config, False, Pool=Pool), 'The pool was not a part of the cache key.'
+
+		finally:
+			Gateways.clear()
+
+class TestExecuteMany(unittest.TestCase):
+	def test_executeMany(self):
+		from sys import executable
+		from time import time
+
+		Hosts = [{'host': 'host%s' % i} for i in range(4)]
+		Lines = []
+
+		start = time()
+		Results = executeMany(Hosts, '%s -c "import time; time.sleep(0.3); print(\'{host}\')"' % executable, workers=4, onOutput=lambda *Args: Lines.append(Args))
+
+		assert time() - start < 1, 'The hosts were not executed on concurrently.'
+		assert [(Result['host'], Result['out'], Result['code']) for Result in Results] == [('host%s' % i, 'host%s\n' % i, 0) for i in range(4)], 'The results are wrong.'
+		assert all(Result['duration'] >= 0.3 for Result in Results), 'The durations are wrong.'
+		assert sorted(Lines) == [('host%s' % i, 'out', 'host%s\n' % i) for i in range(4)], 'The output was not streamed.'
+
+		def factory(SSHConfig):
+			if SSHConfig['host'] == 'host1':
+				raise IOError('Unreachable.')
+
+			return FakeClient(SSHConfig)
+
+		Results = executeMany(Hosts, 'echo', clientFactory=factory)
+		assert Results[1]['code'] is None and isinstance(Results[1]['error'], IOError) and Results[2]['code'] == 0, 'The failure of a host was not isolated.'
+
+class TestUploads(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		from laufire import filesys
+		filesys.fsRoot = filesys.dirname(tempDir)
+
+	def setUp(self):
+		LocalClient.Commands = []
+		LocalSFTP.Puts = {}
+
+	def tearDown(self):
+		removePath(tempDir)
+
+	def test_uploadTree(self):
+		srcDir = '%s/src' % tempDir
+		tgtDir = '%s/tgt' % tempDir
+
+		for i in range(30):
+			setContent('%s/dir%s/sub/file%s.txt' % (srcDir, i % 3, i), 'content %s' % i)
+
+		maxLength = ssh.maxCommandLength
+		ssh.maxCommandLength = 200 # Forces the dirs to be created in batches.
+
+		try:
+			uploadTree(LocalClient(SSHConfig), srcDir, tgtDir, workers=4, TransferErrors=(IOError,))
+
+		finally:
+			ssh.maxCommandLength = maxLength
+
+		assert all(getContent('%s/dir%s/sub/file%s.txt' % (tgtDir, i % 3, i)) == 'content %s' % i for i in range(30)), 'Some files were not uploaded.'
+		assert 1 < len(LocalClient.Commands) < 7, 'The dirs were not created in batches.'
+		assert max(LocalSFTP.Puts.values()) == 2, 'The failed files were not retried.'
+
+	def test_uploadDelta(self):
+		from os import utime
+
+		srcDir = '%s/src' % tempDir
+		tgtDir = '%s/tgt' % tempDir
+		Client = LocalClient(SSHConfig)
+
+		for i in range(1, 10):
+			setContent('%s/dir%s/file%s.txt' % (srcDir, i % 3, i), 'content %s' % i)
+
+		for useMD5 in (False, True):
+			removePath(tgtDir)
+			LocalSFTP.Puts = {}
+
+			uploadDelta(Client, srcDir, tgtDir, useMD5=useMD5, TransferErrors=(IOError,))
+			assert len(LocalSFTP.Puts) == 9 and getContent('%s/dir1/file4.txt' % tgtDir) == getContent('%s/dir1/file4.txt' % srcDir), 'The files were not uploaded.'
+
+			uploadDelta(Client, srcDir, tgtDir, useMD5=useMD5, TransferErrors=(IOError,))
+			assert sum(LocalSFTP.Puts.values()) == 9, 'Unchanged files were uploaded.'
+
+			changedPath = '%s/dir1/file4.txt' % srcDir
+			setContent(changedPath, 'changed %s' % useMD5)
+			utime(changedPath, (0, 0)) # Ensures that the mtime differs.
+			setContent('%s/dir3/file10.txt' % srcDir, 'new')
+
+			uploadDelta(Client, srcDir, tgtDir, useMD5=useMD5, TransferErrors=(IOError,))
+			assert sum(LocalSFTP.Puts.values()) == 12, 'Only the changed files should be uploaded.'
+			assert getContent('%s/dir1/file4.txt' % tgtDir) == 'changed %s' % useMD5 and getContent('%s/dir3/file10.txt' % tgtDir) == 'new'
+
+			removePath('%s/dir3' % srcDir)
+
+	def test_uploadArchive(self):
+		srcDir = '%s/src' % tempDir
+		tgtDir = '%s/tgt' % tempDir
+
+		for i in range(30):
+			setContent('%s/dir%s/sub/file%s.txt' % (srcDir, i % 3, i), 'content %s ' % i * 50)
+
+		Sizes = [uploadArchive(LocalClient(SSHConfig), srcDir, '%s/%s' % (tgtDir, level), level) for level in (0, 9)]
+
+		assert all(getContent('%s/%s/dir%s/sub/file%s.txt' % (tgtDir, level, i % 3, i)) == 'content %s ' % i * 50 for i in range(30) for level in (0, 9)), 'Some files were not uploaded.'
+		assert len(LocalClient.Commands) == 2, 'The trees were not uploaded as single streams.'
+		assert Sizes[1] < Sizes[0], 'The compression level was not respected.'
+
+		mockTgtDir = '%s/mock' % tempDir
+		SSHClientMocker({}).upload(srcDir, mockTgtDir, archive=True)
+		assert getContent('%s/dir2/sub/file29.txt' % mockTgtDir) == 'content 29 ' * 50, 'The mock did not extract the archive.'
+
+	def test_uploadArchive_stderr(self):
+		import sys
+
+		srcDir = '%s/src' % tempDir
+		setContent('%s/big.txt' % srcDir, 'content ' * 2 ** 16) # Larger than the pipe buffers.
+		command = '%s -c %s' % (sys.executable, quote("import sys; sys.stderr.write('x' * 2 ** 20); sys.stdin.read()")) # Writes to stderr, before reading the stream.
+		getExtractCommand = ssh.getExtractCommand
+		Sizes = []
+
+		def upload():
+			Sizes.append(uploadArchive(LocalClient(SSHConfig), srcDir, '%s/tgt' % tempDir, 0))
+			Sizes.append(SSHClientMocker({}).uploadArchive(srcDir, '%s/mock' % tempDir, 0))
+
+		ssh.getExtractCommand = lambda *dummy: command
+
+		try:
+			thread = Thread(target=upload)
+			thread.daemon = True
+			thread.start()
+			thread.join(10)
+
+		finally:
+			ssh.getExtractCommand = getExtractCommand
+
+		assert len(Sizes) == 2, 'The uploads blocked on stderr.'
+
+	def test_mockDelta(self):
+		srcDir = '%s/src' % tempDir
+		tgtDir = '%s/tgt' % tempDir
+		Client = SSHClientMocker({})
+
+		for i in range(1, 10):
+			setContent('%s/dir%s/file%s.txt' % (srcDir, i % 3, i), 'content %s' % i)
+
+		setContent('%s/dir1/stale.txt' % tgtDir, 'stale')
+		setContent('%s/dir1/file4.txt' % tgtDir, 'old')
+
+		Client.upload(srcDir, tgtDir, delta=True, workers=4)
+		assert getContent('%s/dir1/file4.txt' % tgtDir) == 'content 4' and getContent('%s/dir2/file8.txt' % tgtDir) == 'content 8', 'The files were not uploaded.'
+		assert getContent('%s/dir1/stale.txt' % tgtDir) == 'stale', 'The stale file was removed, unlike with ssh.uploadDelta.'
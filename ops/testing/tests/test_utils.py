@@ -0,0 +1,60 @@
+r"""Test the module, utils.
+"""
+import unittest
+
+from laufire.filesys import abspath, ensureCleanDir, removePath, setContent
+from laufire.parser import parse
+from laufire import utils
+from laufire.utils import getManifestTable, getMD5, getTreeMD5
+
+# Data
+Config = parse('data/config.yaml')
+tempDir = abspath(Config['Paths']['temp'])
+baseDir = '%s/base' % tempDir
+manifestPath = '%s/manifest.db' % tempDir
+
+# Tests
+class TestUtils(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		from laufire import filesys
+		filesys.fsRoot = filesys.dirname(tempDir)
+
+	def tearDown(self):
+		removePath(tempDir)
+
+	def test_getTreeMD5(self):
+		ensureCleanDir(baseDir)
+
+		for i in range(20):
+			setContent('%s/dir%s/file%s.txt' % (baseDir, i % 3, i), 'content %s' % i)
+
+		Digests = getTreeMD5(baseDir, '**.txt', manifestPath)
+		assert len(Digests) == 20, 'Some files were not hashed.'
+		assert Digests['dir1/file4.txt'] == getMD5('%s/dir1/file4.txt' % baseDir), 'The digests do not match.'
+
+		Hashed = []
+		hashFiles = utils.hashFiles
+		utils.hashFiles = lambda Paths, processes=None: Hashed.extend(Paths) or hashFiles(Paths, processes) # Records the hashed files.
+
+		try:
+			assert getTreeMD5(baseDir, '**.txt', manifestPath, processes=1) == Digests, 'The digests from the manifest do not match.'
+			assert not Hashed, 'The digests in the manifest were not reused.'
+
+			setContent('%s/dir1/file4.txt' % baseDir, 'changed content')
+			removePath('%s/dir2/file5.txt' % baseDir)
+
+			Changed = getTreeMD5(baseDir, '**.txt', manifestPath)
+
+		finally:
+			utils.hashFiles = hashFiles
+
+		assert Changed['dir1/file4.txt'] == getMD5('%s/dir1/file4.txt' % baseDir), 'The changed file was not rehashed.'
+		assert [path[len(baseDir) + 1:] for path in Hashed] == ['dir1/file4.txt'], 'Unchanged files were rehashed: %s' % Hashed
+		assert 'dir2/file5.txt' not in Changed, 'Removed files were listed.'
+
+		Manifest = getManifestTable(manifestPath)
+		Rows = Manifest.getAll()
+		Manifest.close()
+
+		assert len(Rows) == 19 and not [path for path in Rows if path.endswith('dir2/file5.txt')], 'The row of the removed file was not deleted.'
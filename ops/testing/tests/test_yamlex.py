@@ -0,0 +1,55 @@
+r"""Test the module, yamlex.
+"""
+import unittest
+
+from jinja2 import Template
+
+from laufire import yamlex
+from laufire.yamlex import YamlEx, getTemplate, clearTemplateCache, TemplateCacheStats
+
+# Data
+Data = {'name': 'laufire', 'Paths': {'base': '/base', 'temp': '{{ Paths.base }}/temp'}}
+
+# Tests
+class TestYamlEx(unittest.TestCase):
+	def setUp(self):
+		clearTemplateCache()
+
+	def test_render(self):
+		Y = YamlEx()
+		Y.setData(dict(Data))
+
+		for source in ['{{ name|upper }}', 'plain', 'two\r\nlines\n', '', '{# comment #}text']:
+			assert Y.render(source) == Template(source).render(Data), 'The rendering of "%r" differs from that of Jinja.' % source
+
+	def test_templateCache(self):
+		Y = YamlEx()
+		Y.setData(dict(Data))
+
+		for _ in range(3):
+			Y.render('{{ name }}')
+			Y.render('plain')
+
+		assert TemplateCacheStats == {'hits': 2, 'misses': 1}, 'Templates were compiled more than once, or plain strings were compiled.'
+
+		size = yamlex.templateCacheSize
+		yamlex.templateCacheSize = 2
+
+		try:
+			First = getTemplate('{{ 1 }}')
+			getTemplate('{{ 2 }}')
+			getTemplate('{{ 1 }}') # Makes the first template the most recent.
+			getTemplate('{{ 3 }}')
+
+			assert len(yamlex.TemplateCache) == 2
+			assert getTemplate('{{ 1 }}') is First, 'The recently used template was evicted.'
+
+		finally:
+			yamlex.templateCacheSize = size
+
+	def test_interpolate(self):
+		Y = YamlEx()
+		Y.setData(dict(Data))
+		Y.interpolate()
+
+		assert Y.Data['Paths']['temp'] == '/base/temp'